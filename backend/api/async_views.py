@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+ASYNC_VIEW_NAMES = ('recipe-list', 'recipe-detail', 'ingredients-list',
+                    'tag-list')
+
+executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS,
+                              thread_name_prefix='api-db')
+
+
+def call_view(view, request, *args, **kwargs):
+    """Выполняет синхронный view и рендерит ответ.
+
+    SQL-запросы учитывает api.middleware.record_query по метрикам из
+    скопированного контекста. Соединения с БД закрываются по правилам
+    CONN_MAX_AGE, как в конце обычного запроса, иначе потоки пула
+    держали бы их открытыми.
+    """
+    close_old_connections()
+    metrics = getattr(request, 'metrics', None)
+    try:
+        response = view(request, *args, **kwargs)
+        if metrics is not None:
+            metrics.mark_view_finished()
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка над DRF-view для ASGI-режима.
+
+    GET и HEAD выполняются в ограниченном пуле потоков ASYNC_DB_THREADS,
+    поэтому медленные клиенты и ожидание БД не занимают единственный поток,
+    в котором Django под ASGI выполняет синхронный код. Остальные методы
+    выполняются там же, где и обычные синхронные view. Включается
+    ASYNC_VIEWS и по умолчанию выключена: на замерах compare_servers
+    ASGI с этим пулом давал 0.45–0.7 пропускной способности WSGI.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(call_view)(view, request, *args,
+                                                  **kwargs)
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, partial(
+            context.run, call_view, view, request, *args, **kwargs
+        ))
+
+    return wrapper
+
+
+def async_urlpatterns(urlpatterns):
+    """Подменяет view самых нагруженных чтений на асинхронные."""
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if pattern.name in ASYNC_VIEW_NAMES else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.metrics import token_cache_lookups
+
+User = get_user_model()
+
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+                      'is_active', 'is_staff', 'is_superuser')
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш процесса с временем жизни записей."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+class TokenCache:
+    """Соответствие токена и пользователя в LRU процесса и в кэше Django.
+
+    Хранятся только значения полей из CACHED_USER_FIELDS, и на каждый
+    запрос из них собирается новый объект, поэтому запросы не делят
+    изменяемое состояние. Хэш пароля в кэш не попадает, остальные поля
+    при обращении догружаются из базы как отложенные.
+    Общий уровень включается настройкой TOKEN_CACHE_SHARED, ключом в нём
+    служит хэш токена, а не сам токен.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(settings.TOKEN_CACHE_SIZE,
+                              settings.TOKEN_CACHE_TIMEOUT)
+        self.shared = settings.TOKEN_CACHE_SHARED
+        self.fields = [field.attname for field in User._meta.concrete_fields
+                       if field.attname in CACHED_USER_FIELDS]
+
+    def shared_key(self, key):
+        return f'token:{md5(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        values = self.local.get(key)
+        if values is not None:
+            token_cache_lookups.inc('local')
+            return values
+        if self.shared:
+            values = cache.get(self.shared_key(key))
+            if values is not None:
+                token_cache_lookups.inc('shared')
+                self.local.set(key, values)
+                return values
+        token_cache_lookups.inc('miss')
+        return None
+
+    def set(self, key, token):
+        values = (token.created,
+                  tuple(getattr(token.user, name) for name in self.fields))
+        self.local.set(key, values)
+        if self.shared:
+            cache.set(self.shared_key(key), values,
+                      settings.TOKEN_SHARED_CACHE_TIMEOUT)
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        if self.shared:
+            cache.delete(self.shared_key(key))
+
+    def build(self, key, values):
+        created, user_values = values
+        user = User.from_db(DEFAULT_DB_ALIAS, self.fields, user_values)
+        return user, Token(key=key, user=user, created=created)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая берёт пользователя токена из кэша.
+
+    Записи сбрасываются при удалении токена (в том числе при выходе через
+    token/logout) и при изменении пароля или кэшируемых полей
+    пользователя. Другие процессы узнают
+    об этом не позже чем через TOKEN_CACHE_TIMEOUT секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        values = token_cache.get(key)
+        if values is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return user, token
+        user, token = token_cache.build(key, values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, token
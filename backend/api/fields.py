@@ -0,0 +1,50 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from recipes.images import check_base64_image
+
+
+class QueuedImageField(serializers.CharField):
+    """Картинка в base64, которую декодирует фоновый обработчик.
+
+    При запросе проверяется только сигнатура файла.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('write_only', True)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        check_base64_image(data)
+        return data
+
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии картинки в формате srcset."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_variants')
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        if not variants:
+            return None
+        return {
+            'thumbnail': self.get_url(variants[0]['image']),
+            'srcset': self.get_srcset(variants, 'image'),
+            'webp': self.get_srcset(variants, 'webp'),
+        }
+
+    def get_srcset(self, variants, key):
+        return ', '.join(
+            f'{self.get_url(variant[key])} {variant["width"]}w'
+            for variant in variants
+        )
+
+    def get_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
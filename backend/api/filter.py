@@ -1,6 +1,35 @@
+import re
+
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank)
+from django.db import connections
+from django.db.models import (Case, CharField, F, FloatField, IntegerField,
+                              Value, When)
+from django.db.models.functions import Coalesce, Replace
+from django.utils.html import escape
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
+
+from recipes.constants import (INGREDIENT_SEARCH_LIMIT, RECIPE_SEARCH_CONFIG,
+                               RECIPE_SEARCH_FALLBACK_LIMIT,
+                               RECIPE_SEARCH_HEADLINE_CHARS)
+from recipes.models import AmountIngredient, Recipe, Tag
+
+HEADLINE_START = '<b>'
+HEADLINE_STOP = '</b>'
+HTML_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'),
+                ('"', '&quot;'), ("'", '&#x27;'))
+SEARCH_WEIGHTS = (('name', 1.0), ('ingredients', 0.4), ('text', 0.2))
+RECIPE_ORDERINGS = (('popular', 'Популярные'),
+                    ('trending', 'Набирают популярность'))
 
-from recipes.models import Recipe, Tag
+
+def escape_in_sql(field):
+    """Экранирует HTML в значении поля так же, как django.utils.html.escape."""
+    expression = F(field)
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
 
 
 class RecipeFilter(filters.FilterSet):
@@ -14,6 +43,9 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='is_in_shopping_cart_filter'
     )
+    search = filters.CharFilter(method='search_filter')
+    ordering = filters.ChoiceFilter(choices=RECIPE_ORDERINGS,
+                                    method='ordering_filter')
 
     class Meta:
         model = Recipe
@@ -30,3 +62,145 @@ class RecipeFilter(filters.FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(cart_recipe__user=user)
         return queryset
+
+    def ordering_filter(self, queryset, name, value):
+        """Сортировка по счёту популярности из RecipeScore.
+
+        Рецепты без строки счёта, например ещё не учтённые rollup, не
+        выпадают из выдачи, а идут в конце со счётом 0.
+        """
+        return queryset.annotate(
+            ranking_score=Coalesce(f'score__{value}_score', Value(0.0))
+        ).order_by('-ranking_score', '-id')
+
+    def search_filter(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, ингредиентам и описанию.
+
+        Результаты упорядочены по релевантности, в search_headline
+        попадает экранированный фрагмент описания, в котором слова запроса
+        выделены тегами <b>.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.search_in_postgres(queryset, value)
+        return self.search_in_python(queryset, value)
+
+    def search_in_postgres(self, queryset, value):
+        query = SearchQuery(value, config=RECIPE_SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                escape_in_sql('text'), query, config=RECIPE_SEARCH_CONFIG,
+                start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP
+            )
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    def search_in_python(self, queryset, value):
+        """Переносимый поиск для SQLite: все слова запроса как подстроки.
+
+        Веса полей совпадают с весами A, B и C в PostgreSQL, выдача
+        ограничена RECIPE_SEARCH_FALLBACK_LIMIT лучшими рецептами.
+        """
+        terms = value.casefold().split()
+        ingredients = {}
+        for recipe_id, ingredient_name in AmountIngredient.objects.filter(
+            recipe__in=queryset
+        ).values_list('recipe_id', 'ingredient__name'):
+            ingredients.setdefault(recipe_id, []).append(ingredient_name)
+        matches = []
+        for pk, recipe_name, text, pub_date in queryset.values_list(
+            'pk', 'name', 'text', 'pub_date'
+        ).distinct():
+            fields = {
+                'name': recipe_name.casefold(),
+                'ingredients': ' '.join(ingredients.get(pk, ())).casefold(),
+                'text': text.casefold(),
+            }
+            rank = 0
+            for term in terms:
+                weight = max((weight for field, weight in SEARCH_WEIGHTS
+                              if term in fields[field]), default=0)
+                if not weight:
+                    break
+                rank += weight
+            else:
+                matches.append((rank, pub_date, pk, text))
+        matches.sort(key=lambda match: match[:3], reverse=True)
+        matches = matches[:RECIPE_SEARCH_FALLBACK_LIMIT]
+        if not matches:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=[pk for _, _, pk, _ in matches])
+        return queryset.annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(rank))
+                  for rank, _, pk, _ in matches],
+                output_field=FloatField()
+            ),
+            search_headline=Case(
+                *[When(pk=pk, then=Value(self.headline(text, terms)))
+                  for _, _, pk, text in matches],
+                output_field=CharField()
+            )
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    def headline(self, text, terms):
+        pattern = re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE)
+        match = pattern.search(text)
+        start = 0
+        if match:
+            start = max(match.start() - RECIPE_SEARCH_HEADLINE_CHARS // 4, 0)
+        fragment = text[start:start + RECIPE_SEARCH_HEADLINE_CHARS]
+        parts = []
+        end = 0
+        for found in pattern.finditer(fragment):
+            parts += [escape(fragment[end:found.start()]), HEADLINE_START,
+                      escape(found.group()), HEADLINE_STOP]
+            end = found.end()
+        parts.append(escape(fragment[end:]))
+        return ''.join(parts)
+
+
+class IngredientSearchFilter(BaseFilterBackend):
+    """Поиск ингредиентов по названию для автодополнения.
+
+    Сначала идут совпадения с начала названия, затем вхождения в середине.
+    На PostgreSQL поиск опирается на индексы по UPPER(name), на остальных
+    СУБД регистр сравнивается в Python, так как SQLite не приводит
+    к одному регистру кириллицу.
+    """
+
+    search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            return queryset.filter(name__icontains=name).annotate(
+                match_rank=Case(
+                    When(name__istartswith=name, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField()
+                )
+            ).order_by('match_rank', 'name')[:INGREDIENT_SEARCH_LIMIT]
+        return self.filter_in_python(queryset, name)
+
+    def filter_in_python(self, queryset, name):
+        needle = name.casefold()
+        matches = sorted(
+            (not ingredient_name.casefold().startswith(needle),
+             ingredient_name, pk)
+            for pk, ingredient_name in queryset.values_list('pk', 'name')
+            if needle in ingredient_name.casefold()
+        )[:INGREDIENT_SEARCH_LIMIT]
+        ids = [pk for _, _, pk in matches]
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *[When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        ))
@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.run_benchmark import percentile
+from recipes.models import Ingredient, Recipe
+
+SERVERS = (('wsgi', 8101), ('asgi', 8102))
+ENDPOINTS = (
+    ('recipes_list', '/api/recipes/?limit=6'),
+    ('recipe_detail', '/api/recipes/{recipe_id}/'),
+    ('ingredients_search', '/api/ingredients/?name={ingredient_prefix}'),
+    ('tags_list', '/api/tags/'),
+)
+
+
+def fetch(url):
+    started = time.perf_counter()
+    with urlopen(url, timeout=60) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пропускной способности gunicorn с sync-воркерами '
+            'и с uvicorn-воркерами (ASGI) под параллельной нагрузкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов к каждому эндпоинту.')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Количество одновременных клиентов.')
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Количество процессов gunicorn.')
+        parser.add_argument('--only', nargs='*',
+                            help='Замерить только указанные эндпоинты.')
+        parser.add_argument('--output', help='Сохранить результат в JSON.')
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or ingredient is None:
+            raise CommandError('Нет данных: запустите seed_benchmark.')
+        context = {'recipe_id': recipe.id,
+                   'ingredient_prefix': quote(ingredient.name[:3])}
+        results = {}
+        for mode, port in SERVERS:
+            server = self.start_server(mode, port, options['workers'])
+            try:
+                results[mode] = self.run_load(f'http://127.0.0.1:{port}',
+                                              context, options)
+            finally:
+                server.terminate()
+                server.wait()
+        for name in results['wsgi']:
+            wsgi, asgi = results['wsgi'][name], results['asgi'][name]
+            self.stdout.write(
+                f'{name}: wsgi {wsgi["rps"]:.0f} rps, p95 '
+                f'{wsgi["p95"]:.1f} мс; asgi {asgi["rps"]:.0f} rps, p95 '
+                f'{asgi["p95"]:.1f} мс ({asgi["rps"] / wsgi["rps"]:.2f}x)'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+
+    def start_server(self, mode, port, workers):
+        env = dict(
+            os.environ,
+            SERVER_MODE=mode,
+            GUNICORN_BIND=f'127.0.0.1:{port}',
+            GUNICORN_WORKERS=str(workers),
+            ALLOWED_HOSTS=','.join(settings.ALLOWED_HOSTS + ['127.0.0.1']),
+            REQUEST_METRICS_LOG_LEVEL='WARNING',
+        )
+        server = subprocess.Popen(
+            (sys.executable, '-m', 'gunicorn'), cwd=settings.BASE_DIR,
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for _ in range(100):
+            try:
+                fetch(f'http://127.0.0.1:{port}/api/tags/')
+                return server
+            except (URLError, ConnectionError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Сервер {mode} не запустился на порту {port}.')
+
+    def run_load(self, base_url, context, options):
+        results = {}
+        for name, path in ENDPOINTS:
+            if options['only'] and name not in options['only']:
+                continue
+            url = base_url + path.format(**context)
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                list(pool.map(fetch, [url] * options['concurrency']))
+                started = time.perf_counter()
+                try:
+                    timings = list(pool.map(fetch,
+                                            [url] * options['requests']))
+                except URLError as error:
+                    raise CommandError(f'{url}: {error}')
+                elapsed = time.perf_counter() - started
+            results[name] = {
+                'url': url,
+                'rps': options['requests'] / elapsed,
+                'p50': percentile(timings, 50),
+                'p95': percentile(timings, 95),
+                'p99': percentile(timings, 99),
+            }
+        return results
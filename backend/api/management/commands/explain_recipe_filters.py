@@ -0,0 +1,98 @@
+import json
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.filter import RecipeFilter
+from recipes.dataset import generate_dataset
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+
+PAGE_SIZE = 6
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN и замеры времени для запросов фильтра рецептов. '
+            'Результат сохраняется в JSON и сравнивается с прошлым запуском.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', type=int, default=0,
+                            help='Сгенерировать набор из N рецептов.')
+        parser.add_argument('--prefix', default='explain',
+                            help='Префикс записей сгенерированного набора.')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Количество повторов каждого запроса.')
+        parser.add_argument('--analyze', action='store_true',
+                            help='EXPLAIN ANALYZE (только PostgreSQL).')
+        parser.add_argument('--output', help='Куда сохранить результат.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого запуска для сравнения.')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            generate_dataset(prefix=options['prefix'],
+                             users=max(options['generate'] // 10, 2),
+                             recipes=options['generate'])
+        results = {}
+        for name, queryset in self.get_querysets().items():
+            results[name] = self.measure(queryset, options)
+            self.stdout.write(
+                f'{name}: {results[name]["median_ms"]:.2f} мс\n'
+                f'{results[name]["plan"]}\n'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(results, options['compare'])
+
+    def get_querysets(self):
+        user = CustomUser.objects.annotate(
+            favorites=Count('favorites_user')
+        ).order_by('-favorites').first()
+        author = CustomUser.objects.order_by('-recipes_count').first()
+        tag = Tag.objects.first()
+        if user is None or tag is None:
+            raise CommandError('Нет данных: запустите с --generate N.')
+        filters = {
+            'list': {},
+            'tags': {'tags': [tag.slug]},
+            'author': {'author': str(author.id)},
+            'is_favorited': {'is_favorited': 'true'},
+            'is_in_shopping_cart': {'is_in_shopping_cart': 'true'},
+        }
+        request = SimpleNamespace(user=user)
+        return {
+            name: RecipeFilter(data, queryset=Recipe.objects.all(),
+                               request=request).qs[:PAGE_SIZE]
+            for name, data in filters.items()
+        }
+
+    def measure(self, queryset, options):
+        timings = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        return {
+            'sql': str(queryset.query),
+            'plan': queryset.explain(**explain_options),
+            'median_ms': statistics.median(timings),
+        }
+
+    def compare(self, results, path):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]['median_ms']
+            after = result['median_ms']
+            self.stdout.write(
+                f'{name}: {before:.2f} мс -> {after:.2f} мс '
+                f'(x{before / after if after else 0:.1f})'
+            )
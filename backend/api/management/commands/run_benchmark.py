@@ -0,0 +1,140 @@
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe
+from users.models import CustomUser
+
+# (название, URL, нужна ли авторизация)
+ENDPOINTS = (
+    ('recipes_list', '/api/recipes/?limit=6', False),
+    ('recipes_list_100', '/api/recipes/?limit=100', False),
+    ('recipes_list_auth', '/api/recipes/?limit=6', True),
+    ('recipe_detail', '/api/recipes/{recipe_id}/', True),
+    ('ingredients_list', '/api/ingredients/', False),
+    ('ingredients_search', '/api/ingredients/?name={ingredient_prefix}',
+     False),
+    ('subscriptions', '/api/users/subscriptions/?limit=6&recipes_limit=3',
+     True),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/', True),
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class Command(BaseCommand):
+    help = ('Замер задержек и числа SQL-запросов основных эндпоинтов '
+            'через тестовый клиент Django со сравнением с базовой линией.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='*',
+                            help='Замерить только указанные эндпоинты.')
+        parser.add_argument('--baseline',
+                            default=str(settings.BASE_DIR
+                                        / 'benchmark_baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Сохранить результат как базовую линию.')
+        parser.add_argument('--tolerance', type=float, default=1.5,
+                            help='Допустимый рост p95 относительно базы.')
+        parser.add_argument('--min-delta', type=float, default=5,
+                            help='Рост p95 в мс, который считается шумом.')
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.annotate(
+            carts=Count('cart_user')
+        ).order_by('-carts', '-subscribers_count').first()
+        recipe = Recipe.objects.first()
+        ingredient = Ingredient.objects.first()
+        if user is None or recipe is None or ingredient is None:
+            raise CommandError('Нет данных: запустите seed_benchmark.')
+        token, _ = Token.objects.get_or_create(user=user)
+        context = {'recipe_id': recipe.id,
+                   'ingredient_prefix': ingredient.name[:3]}
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        results = {}
+        for name, url, auth in ENDPOINTS:
+            if options['only'] and name not in options['only']:
+                continue
+            headers = {}
+            if auth:
+                headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+            results[name] = self.measure(client, url.format(**context),
+                                         headers, options)
+            self.stdout.write(
+                '{name}: p50 {p50:.1f} мс, p95 {p95:.1f} мс, '
+                'p99 {p99:.1f} мс, запросов {queries}'.format(
+                    name=name, **results[name]
+                )
+            )
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f'Базовая линия сохранена: '
+                              f'{options["baseline"]}')
+            return
+        self.check_regressions(results, options)
+
+    def measure(self, client, url, headers, options):
+        timings = []
+        queries = 0
+        for run in range(options['warmup'] + options['runs']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url, **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise CommandError(f'{url}: код ответа '
+                                   f'{response.status_code}.')
+            if run >= options['warmup']:
+                timings.append(elapsed)
+                queries = max(queries, len(context.captured_queries))
+        return {
+            'url': url,
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': queries,
+        }
+
+    def check_regressions(self, results, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            self.stdout.write('Базовой линии нет, сравнение пропущено.')
+            return
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            base = baseline[name]
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {base["queries"]} -> '
+                    f'{result["queries"]}'
+                )
+            if (result['p95'] > base['p95'] * options['tolerance']
+                    and result['p95'] - base['p95'] > options['min_delta']):
+                regressions.append(
+                    f'{name}: p95 {base["p95"]:.1f} -> '
+                    f'{result["p95"]:.1f} мс'
+                )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write('Регрессий нет.')
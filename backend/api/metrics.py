@@ -0,0 +1,108 @@
+import re
+import threading
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Нормализует SQL так, чтобы IN-списки разной длины совпадали."""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class Histogram:
+    """Гистограмма Prometheus с меткой view, хранящаяся в процессе."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self.lock:
+            series = self.series.setdefault(
+                view, {'buckets': [0] * len(self.buckets), 'sum': 0,
+                       'count': 0}
+            )
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][position] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} histogram']
+        with self.lock:
+            for view, series in sorted(self.series.items()):
+                label = f'view="{view}"'
+                for bound, value in zip(self.buckets, series['buckets']):
+                    lines.append(
+                        f'{self.name}_bucket{{{label},le="{bound}"}} {value}'
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{label},le="+Inf"}} '
+                    f'{series["count"]}'
+                )
+                lines.append(f'{self.name}_sum{{{label}}} {series["sum"]}')
+                lines.append(
+                    f'{self.name}_count{{{label}}} {series["count"]}'
+                )
+        return lines
+
+
+class Counter:
+    """Счётчик Prometheus с одной меткой, хранящийся в процессе."""
+
+    def __init__(self, name, description, label):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value):
+        with self.lock:
+            self.series[value] = self.series.get(value, 0) + 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} counter']
+        with self.lock:
+            for value, count in sorted(self.series.items()):
+                lines.append(f'{self.name}{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.',
+    DURATION_BUCKETS
+)
+db_duration = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время SQL-запросов за один запрос (по выборке).',
+    DURATION_BUCKETS
+)
+db_queries = Histogram(
+    'foodgram_db_queries',
+    'Количество SQL-запросов за один запрос (по выборке).',
+    QUERY_BUCKETS
+)
+token_cache_lookups = Counter(
+    'foodgram_token_cache_lookups_total',
+    'Проверки токенов по уровню кэша, из которого взят пользователь.',
+    'result'
+)
+METRICS = (request_duration, db_duration, db_queries, token_cache_lookups)
+
+
+def render_metrics():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api.metrics import db_duration, db_queries, fingerprint, request_duration
+
+logger = logging.getLogger('api.metrics')
+
+current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """SQL-запросы и отметки времени одного запроса."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0
+        self.view_started = None
+        self.view_finished = None
+        self.db_time_in_view = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[fingerprint(sql)] += 1
+
+    def mark_view_started(self):
+        self.view_started = time.perf_counter()
+        self.db_time_in_view = self.db_time
+
+    def mark_view_finished(self):
+        if self.view_finished is not None:
+            return
+        self.view_finished = time.perf_counter()
+        self.db_time_in_view = self.db_time - self.db_time_in_view
+
+
+def record_query(execute, sql, params, many, context):
+    """Учитывает SQL-запрос в метриках текущего запроса, если они есть.
+
+    Метрики берутся из contextvar: sync_to_async копирует контекст
+    в поток, где под ASGI выполняются синхронные view, поэтому запросы
+    учитываются одинаково под WSGI и ASGI.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """Ставит record_query первой обёрткой запросов соединения.
+
+    В начало списка, потому что connection.execute_wrapper() снимает
+    последнюю обёртку, а соединение может открыться внутри него.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class RequestMetricsMiddleware:
+    """Считает SQL-запросы и время обработки каждого запроса.
+
+    Для доли запросов REQUEST_METRICS_SAMPLE_RATE запросы к базе
+    учитываются через record_query: в ответ добавляется заголовок
+    Server-Timing, а в лог api.metrics пишется запись с повторяющимися
+    запросами (признак N+1).
+    Время обработки всех запросов попадает в гистограммы /api/_metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE',
+                                   0.01)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = current_metrics.set(self.start(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.finish(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        token = current_metrics.set(self.start(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.finish(request, response, started)
+        return response
+
+    def start(self, request):
+        if random.random() >= self.sample_rate:
+            return None
+        request.metrics = RequestMetrics()
+        return request.metrics
+
+    def finish(self, request, response, started):
+        total = time.perf_counter() - started
+        view = self.get_view_name(request)
+        request_duration.observe(view, total)
+        metrics = getattr(request, 'metrics', None)
+        if metrics is None:
+            return
+        db_duration.observe(view, metrics.db_time)
+        db_queries.observe(view, sum(metrics.queries.values()))
+        self.add_server_timing(response, metrics, total)
+        self.log(request, response, view, metrics, total)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'metrics'):
+            request.metrics.mark_view_started()
+
+    def process_template_response(self, request, response):
+        if hasattr(request, 'metrics'):
+            request.metrics.mark_view_finished()
+        return response
+
+    def get_view_name(self, request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return 'unmatched'
+        return resolver_match.view_name
+
+    def add_server_timing(self, response, metrics, total):
+        count = sum(metrics.queries.values())
+        timings = [f'db;dur={metrics.db_time * 1000:.1f};'
+                   f'desc="{count} queries"']
+        if metrics.view_finished is not None:
+            view_time = metrics.view_finished - metrics.view_started
+            timings.append(
+                f'app;dur='
+                f'{(view_time - metrics.db_time_in_view) * 1000:.1f};'
+                f'desc="view without SQL"'
+            )
+            timings.append(f'render;dur='
+                           f'{(total - view_time) * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+
+    def log(self, request, response, view, metrics, total):
+        duplicates = [
+            {'sql': sql[:300], 'count': count}
+            for sql, count in metrics.queries.most_common()
+            if count > 1
+        ]
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'queries': sum(metrics.queries.values()),
+            'duplicates': duplicates,
+        }, ensure_ascii=False))
@@ -0,0 +1,132 @@
+from copy import deepcopy
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+
+class CatalogMixin:
+    """Отдаёт справочник из кэша и поддерживает условные GET-запросы."""
+
+    catalog = None
+    catalog_bypass_params = ()
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        if any(param in request.query_params
+               for param in self.catalog_bypass_params):
+            return super().list(request, *args, **kwargs)
+        return Response(self.catalog.items())
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        pk = kwargs[self.lookup_field]
+        item = self.catalog.get(int(pk)) if pk.isdigit() else None
+        if item is None:
+            raise NotFound()
+        return Response(item)
+
+    def get_not_modified_response(self, request):
+        version = self.catalog.version()
+        return get_conditional_response(
+            request,
+            etag=self.get_catalog_etag(version),
+            last_modified=int(version)
+        )
+
+    def get_catalog_etag(self, version):
+        return quote_etag(f'{self.catalog.name}-{version}')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if response.status_code in (200, 304):
+            version = self.catalog.version()
+            response['ETag'] = self.get_catalog_etag(version)
+            response['Last-Modified'] = http_date(version)
+        return response
+
+
+class ResponseCacheMixin:
+    """Отдаёт готовые JSON-ответы list и retrieve из общего кэша.
+
+    В кэше хранится представление без данных пользователя, поэтому ключом
+    служат хост, идентификатор и упорядоченные параметры. Анонимам ответ
+    отдаётся как есть, а авторизованным пользователям поверх него
+    проставляются их флаги через overlay_user_data(). Параметры из
+    user_filter_params меняют выборку для пользователя и кэш обходят.
+    """
+
+    response_cache = None
+    cached_renderer_format = 'json'
+    user_filter_params = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
+
+    def overlay_user_data(self, data, request):
+        """Проставляет в data флаги пользователя из request.
+
+        При request=None флаги сбрасываются для записи в кэш. Ответам без
+        пользовательских данных переопределение не нужно.
+        """
+        return data
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if (request.accepted_renderer.format != self.cached_renderer_format
+                or request.user.is_authenticated
+                and any(param in request.query_params
+                        for param in self.user_filter_params)):
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request, kwargs)
+        version = self.response_cache.version()
+        cached = self.response_cache.get(key, version)
+        if cached is None:
+            request.response_cache_key = (key, version)
+            return handler(request, *args, **kwargs)
+        data, content, content_type = cached
+        if request.user.is_authenticated:
+            return Response(self.overlay_user_data(data, request))
+        return HttpResponse(content, content_type=content_type)
+
+    def get_response_cache_key(self, request, kwargs):
+        params = urlencode(sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        ))
+        raw_key = (f'{self.action}|{request.scheme}://{request.get_host()}|'
+                   f'{kwargs.get(self.lookup_field, "")}|{params}')
+        return md5(raw_key.encode()).hexdigest()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        cache_key = getattr(request, 'response_cache_key', None)
+        if cache_key is not None and response.status_code == 200:
+            data = self.overlay_user_data(deepcopy(response.data), None)
+            renderer = request.accepted_renderer
+            content = renderer.render(data, request.accepted_media_type,
+                                      self.get_renderer_context())
+            content_type = request.accepted_media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            key, version = cache_key
+            self.response_cache.set(key, version,
+                                    (data, content, content_type))
+        return response
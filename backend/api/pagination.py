@@ -1,7 +1,171 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.feed import feed_entries
+
+KEYSET_PAGE_SIZE = 6
+
+
+class KeysetPaginator(BasePagination):
+    """Keyset-пагинация по полям сортировки с id, без COUNT и OFFSET.
+
+    Курсор хранит значения полей сортировки последней записи страницы,
+    следующая страница выбирается условием «после этих значений».
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request, queryset)
+        if values is not None:
+            queryset = queryset.filter(self.get_after_filter(values))
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param, '')
+        if limit.isdigit() and int(limit) > 0:
+            return int(limit)
+        return KEYSET_PAGE_SIZE
+
+    def get_ordering(self, queryset):
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_after_filter(self, values):
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            field = field.lstrip('-')
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = []
+        for field in self.ordering:
+            value = last
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(values, default=str).encode()
+        ).decode()
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param, cursor)
+
+    def get_ordering_fields(self, queryset):
+        """Поля модели или аннотации, по которым идёт сортировка."""
+        fields = []
+        for name in self.ordering:
+            path = name.lstrip('-').split('__')
+            annotation = queryset.query.annotations.get(path[0])
+            if annotation is not None:
+                fields.append(annotation.output_field)
+                continue
+            model = queryset.model
+            for attr in path:
+                field = (model._meta.pk if attr == 'pk'
+                         else model._meta.get_field(attr))
+                model = field.related_model
+            fields.append(field)
+        return fields
+
+    def decode_cursor(self, request, queryset):
+        """Значения курсора, приведённые к типам полей сортировки."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(values, list)
+                or len(values) != len(self.ordering)
+                or any(isinstance(value, (dict, list)) for value in values)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                field.to_python(value) for field, value
+                in zip(self.get_ordering_fields(queryset), values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+
+class FeedPaginator(KeysetPaginator):
+    """Keyset-пагинация ленты подписок по дате публикации и id рецепта."""
+
+    ordering = ('-pub_date', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        values = self.decode_cursor(request, queryset)
+        after = None if values is None else tuple(values)
+        entries = feed_entries(request.user.id, after, self.page_size + 1)
+        self.has_next = len(entries) > self.page_size
+        ids = [recipe_id for _, recipe_id in entries[:self.page_size]]
+        recipes = queryset.in_bulk(ids)
+        self.page = [recipes[pk] for pk in ids if pk in recipes]
+        return self.page
 
 
 class CustomPaginator(PageNumberPagination):
-    """Стандартный пагинатор для вывода запрошенного количества страниц."""
+    """Стандартный пагинатор для вывода запрошенного количества страниц.
+
+    При наличии параметра cursor переключается на KeysetPaginator.
+    """
 
     page_size_query_param = 'limit'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPaginator.cursor_query_param in request.query_params:
+            self.keyset = KeysetPaginator()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return ''
+        return super().to_html()
@@ -19,5 +19,6 @@ class AuthorAdminOrReadOnly(permissions.BasePermission):
         return (
             request.method in permissions.SAFE_METHODS
             or request.user.is_authenticated
-            and (request.user.is_staff or request.user == obj.author)
+            and (request.user.is_staff
+                 or obj.author_id == request.user.id)
         )
@@ -0,0 +1,99 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+from tempfile import TemporaryFile
+
+from openpyxl import Workbook
+from rest_framework import renderers
+
+SHOPPING_LIST_HEADER = ('Наименование ингредиента', 'Единица измерения',
+                        'Количество')
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку вместо её хранения."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(renderers.BaseRenderer, metaclass=ABCMeta):
+    """Базовый рендерер файла со списком покупок.
+
+    Сам файл отдаётся потоком через stream(), а render() используется
+    только для ответов об ошибках.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    @abstractmethod
+    def stream(self, rows):
+        """Итератор частей файла по строкам списка покупок."""
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADER)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в виде простого текста."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield 'Список покупок:\n\n'
+        for name, measurement_unit, amount in rows:
+            yield f'{name} ({measurement_unit}) — {amount}\n'
+
+
+class XLSXShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в виде таблицы Excel.
+
+    XLSX — zip-архив, и его оглавление пишется в конце, поэтому первый
+    байт уходит только после сборки всего файла. Строки в режиме
+    write_only сбрасываются на диск, архив сохраняется во временный файл
+    и отдаётся частями, так что в памяти файл целиком не держится.
+    """
+
+    media_type = ('application/vnd.openxmlformats-officedocument.'
+                  'spreadsheetml.sheet')
+    format = 'xlsx'
+    charset = None
+
+    def stream(self, rows):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Список покупок')
+        sheet.append(SHOPPING_LIST_HEADER)
+        for row in rows:
+            sheet.append(row)
+        with TemporaryFile() as file:
+            workbook.save(file)
+            file.seek(0)
+            yield from iter(lambda: file.read(XLSX_CHUNK_SIZE), b'')
+
+
+SHOPPING_LIST_RENDERERS = (CSVShoppingListRenderer,
+                           TextShoppingListRenderer,
+                           XLSXShoppingListRenderer)
@@ -1,15 +1,49 @@
 import re
 
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from recipes.models import (AmountIngredient, Cart, Favorites, Ingredient,
-                            Recipe, Tag)
+from api.fields import ImageSrcsetField, QueuedImageField
+from recipes.cache import (EMPTY_RELATIONS, get_user_relations,
+                           ingredient_catalog, tag_catalog)
+from recipes.constants import (BULK_LIST_MAX, IMAGE_STATUS_PENDING,
+                               RECOMMENDATION_LIMIT_DEFAULT,
+                               RECOMMENDATION_LIMIT_MAX)
+from recipes.jobs import enqueue_image
+from recipes.lines import replace_lines
+from recipes.models import (AmountIngredient, Ingredient, Recipe,
+                            ShoppingListItem, Tag)
 from users.models import CustomUser, Subscriptions
 
+RANKING_FIELDS = ('search_headline', 'coverage', 'missing_count',
+                  'similarity')
+
+
+def get_request_relations(context):
+    """Связи текущего пользователя, загруженные один раз за запрос."""
+    request = context.get('request')
+    if request is None or not request.user.is_authenticated:
+        return EMPTY_RELATIONS
+    relations = getattr(request, 'user_relations', None)
+    if relations is None:
+        relations = get_user_relations(request.user.id)
+        request.user_relations = relations
+    return relations
+
+
+def overlay_relations(recipe, relations):
+    """Проставляет флаги пользователя в готовое представление рецепта."""
+    recipe['is_favorited'] = recipe['id'] in relations.favorites
+    recipe['is_in_shopping_cart'] = recipe['id'] in relations.cart
+    author = recipe['author']
+    author['is_subscribed'] = author['id'] in relations.subscriptions
+    return recipe
+
 
 class CustomUserSerializer(UserSerializer):
     """Сериализатор для пользовательской модели."""
@@ -41,10 +75,9 @@ class CustomUserSerializer(UserSerializer):
         return super(UserSerializer, self).create(validated_data)
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated and isinstance(obj, CustomUser):
-            return Subscriptions.objects.filter(user=user, author=obj).exists()
-        return False
+        if not isinstance(obj, CustomUser):
+            return False
+        return obj.id in get_request_relations(self.context).subscriptions
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -71,13 +104,47 @@ class AddToRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления в список покупок и в избранное рецептов."""
 
     image = Base64ImageField()
+    image_srcset = ImageSrcsetField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_srcset', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id для массового добавления и удаления."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_LIST_MAX
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class RecommendationParamsSerializer(serializers.Serializer):
+    """Сериализатор параметров подбора похожих рецептов."""
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=RECOMMENDATION_LIMIT_MAX,
+        default=RECOMMENDATION_LIMIT_DEFAULT
+    )
+
+
+class CookParamsSerializer(RecommendationParamsSerializer):
+    """Сериализатор параметров подбора рецептов по ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_LIST_MAX
+    )
+
+
 class SubscriptionsSerializer(CustomUserSerializer):
     """Сериализатор для получения информации о подписках."""
 
@@ -87,7 +154,7 @@ class SubscriptionsSerializer(CustomUserSerializer):
     first_name = serializers.ReadOnlyField(source='author.first_name')
     last_name = serializers.ReadOnlyField(source='author.last_name')
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Subscriptions
@@ -112,13 +179,11 @@ class SubscriptionsSerializer(CustomUserSerializer):
         return data
 
     def get_recipes(self, obj):
-        user = obj.user
-        if user.is_authenticated:
-            recipes_queryset = user.recipes.all()
-            return AddToRecipeSerializer(recipes_queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.user.recipes.count()
+        recipes = getattr(obj.author, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.author.recipes.all()
+        return AddToRecipeSerializer(recipes, many=True,
+                                     context=self.context).data
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -152,10 +217,25 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор для модели ShoppingListItem."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+    amount = serializers.ReadOnlyField(source='total_amount')
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
     """Сериализатор для получения рецепта."""
 
-    author = CustomUserSerializer(read_only=True)
+    author = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
     ingredients = AmountIngredientSerializer(
         many=True, read_only=True, source='recipes'
@@ -163,6 +243,7 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_srcset = ImageSrcsetField()
 
     class Meta:
         model = Recipe
@@ -175,22 +256,28 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_srcset',
+            'image_status',
             'text',
             'cooking_time'
         )
 
+    def get_author(self, obj):
+        return CustomUserSerializer(obj.author, context=self.context).data
+
     def get_is_favorited(self, obj):
-        return self._check_item_in_list(obj, Favorites)
+        return obj.id in get_request_relations(self.context).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        return self._check_item_in_list(obj, Cart)
+        return obj.id in get_request_relations(self.context).cart
 
-    def _check_item_in_list(self, obj, model):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            user = request.user
-            return model.objects.filter(user=user, recipe=obj).exists()
-        return False
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in RANKING_FIELDS:
+            value = getattr(instance, name, None)
+            if value is not None:
+                data[name] = value
+        return data
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
@@ -207,8 +294,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания, удаления и изменения рецепта."""
 
     author = CustomUserSerializer(read_only=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = QueuedImageField()
 
     class Meta:
         model = Recipe
@@ -237,9 +325,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         unique_tags = set(value)
         if len(value) != len(unique_tags):
             raise ValidationError('Теги должны быть уникальными.')
-        existing_tags = Tag.objects.filter(pk__in=[tag.id for tag in value])
-        if len(existing_tags) != len(value):
-            raise ValidationError('Нужно указать хотя бы 1 существующий тег.')
+        if not tag_catalog.exists(unique_tags):
+            raise ValidationError('Тег(и) отсутствует(-ют) в базе данных.')
         return value
 
     def validate_ingredients(self, value):
@@ -258,8 +345,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ingredient_ids.add(ingredient_id)
         if len(ingredient_ids) != len(value):
             raise ValidationError('Ингредиенты должны быть уникальны.')
-        existing_ingredients = Ingredient.objects.filter(pk__in=ingredient_ids)
-        if len(existing_ingredients) != len(ingredient_ids):
+        if not ingredient_catalog.exists(ingredient_ids):
             raise serializers.ValidationError(
                 'Ингредиент(ы) отсутствует(-ют) в базе данных.')
         return value
@@ -269,40 +355,58 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('image - обязательное поле.')
         return value
 
-    def tags_and_ingredients_set(self, recipe, tags, ingredients):
-        recipe.tags.set(tags)
-        recipe_ingredients = [
-            AmountIngredient(
-                recipe=recipe,
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
-                amount=ingredient['amount']
+    def validate(self, data):
+        if not data.get('tags'):
+            raise ValidationError({'tags': 'tags - обязательное поле.'})
+        if not data.get('ingredients'):
+            raise ValidationError(
+                {'ingredients': 'Нет ни одного ингредиента.'}
             )
-            for ingredient in ingredients
-        ]
-        AmountIngredient.objects.bulk_create(recipe_ingredients)
+        return data
 
+    def tags_and_ingredients_set(self, recipe, tags, ingredients,
+                                 created=False):
+        """Синхронизирует теги и ингредиенты рецепта с переданными."""
+        if created:
+            recipe.tags.add(*tags)
+        else:
+            recipe.tags.set(tags)
+        replace_lines(
+            recipe, {item['id']: item['amount'] for item in ingredients},
+            created=created
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients_data = validated_data.pop('ingredients', [])
-        tags_data = validated_data.pop('tags', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self.tags_and_ingredients_set(recipe, tags_data, ingredients_data)
+        ingredients_data = validated_data.pop('ingredients')
+        tags_data = validated_data.pop('tags')
+        image = validated_data.pop('image')
+        recipe = Recipe.objects.create(
+            image='', image_status=IMAGE_STATUS_PENDING, **validated_data
+        )
+        self.tags_and_ingredients_set(recipe, tags_data, ingredients_data,
+                                      created=True)
+        enqueue_image(recipe, image)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get('cooking_time',
-                                                   instance.cooking_time)
-        tags_data = validated_data.pop('tags', [])
-        self.validate_tags(tags_data)
-        ingredients_data = validated_data.pop('ingredients', [])
-        self.validate_ingredients(ingredients_data)
-        AmountIngredient.objects.filter(
-            recipe=instance,
-            ingredient__in=instance.ingredients.all()).delete()
+        ingredients_data = validated_data.pop('ingredients')
+        tags_data = validated_data.pop('tags')
+        image = validated_data.pop('image', None)
+        instance = super().update(instance, validated_data)
         self.tags_and_ingredients_set(instance, tags_data, ingredients_data)
-        instance.save()
+        if image is not None:
+            enqueue_image(instance, image)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch('recipes',
+                     queryset=AmountIngredient.objects.select_related(
+                         'ingredient'
+                     ))
+        )
         return RecipeGetSerializer(instance, context=self.context).data
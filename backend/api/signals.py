@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from users.models import CustomUser
+
+# Поля, после изменения которых записи кэша токенов устаревают: пароль
+# и всё, что кэш отдаёт вместо пользователя, включая is_active.
+TOKEN_CACHE_FIELDS = frozenset(token_cache.fields) | {'password'}
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(instance, **kwargs):
+    transaction.on_commit(lambda: token_cache.invalidate(instance.key))
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_token_cache_values(instance, update_fields, **kwargs):
+    if instance._state.adding:
+        return
+    fields = TOKEN_CACHE_FIELDS
+    if update_fields is not None:
+        fields = fields & set(update_fields)
+    if fields:
+        instance._token_cache_values = CustomUser.objects.filter(
+            pk=instance.pk
+        ).values(*fields).first()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_tokens(instance, created, **kwargs):
+    previous = instance.__dict__.pop('_token_cache_values', None)
+    if created or previous is None or all(
+        getattr(instance, name) == value for name, value in previous.items()
+    ):
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+    def invalidate():
+        for key in keys:
+            token_cache.invalidate(key)
+
+    transaction.on_commit(invalidate)
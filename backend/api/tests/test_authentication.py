@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+
+User = get_user_model()
+
+
+class TokenCacheTest(TestCase):
+    """Кэш пользователей по токену авторизации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='Old$ecret123'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        token_cache.invalidate(self.token.key)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_password_hash_is_not_cached(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        created, values = token_cache.get(self.token.key)
+        self.assertNotIn('password', token_cache.fields)
+        self.assertNotIn(self.user.password, values)
+
+    def test_cached_user_can_change_password(self):
+        self.client.get('/api/users/me/')
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'Old$ecret123',
+            'new_password': 'New$ecret123',
+        })
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('New$ecret123'))
+        self.assertEqual(self.user.email, 'reader@example.com')
+
+    def cached(self):
+        return token_cache.get(self.token.key) is not None
+
+    def test_unrelated_saves_keep_cache(self):
+        self.client.get('/api/users/me/')
+        self.user.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+            self.user.save(update_fields=('last_login',))
+        self.assertTrue(self.cached())
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=('recipes_count',))
+
+    def test_auth_changes_invalidate_cache(self):
+        for name, value in (('password', '!'), ('is_active', False)):
+            with self.subTest(field=name):
+                self.client.get('/api/users/me/')
+                self.assertTrue(self.cached())
+                setattr(self.user, name, value)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.user.save(update_fields=(name,))
+                self.assertFalse(self.cached())
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_created_user_does_not_touch_tokens(self):
+        with mock.patch.object(token_cache, 'invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as queries:
+                    User.objects.create_user(
+                        username='new', email='new@example.com',
+                        password='New$ecret123'
+                    )
+        invalidate.assert_not_called()
+        self.assertEqual(len(queries), 1)
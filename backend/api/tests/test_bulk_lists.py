@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.counters import reconcile_counters
+from recipes.models import (AmountIngredient, Cart, FeedItem, Ingredient,
+                            Recipe, ShoppingListItem)
+from users.models import Subscriptions
+
+User = get_user_model()
+
+BULK_REMOVE_SIZES = (2, 8)
+AUTHORS = 10
+
+
+class BulkRemoveTest(TestCase):
+    """Массовое удаление из избранного, корзины и подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{number}', password='pass',
+                email=f'author{number}@example.com'
+            )
+            for number in range(AUTHORS)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipes = []
+        for author in cls.authors:
+            recipe = Recipe.objects.create(
+                author=author, name='Рецепт', text='Описание',
+                cooking_time=5, image='recipes/images/test.png'
+            )
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=10)
+                for ingredient in ingredients
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def change(self, method, url, ids):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(
+                    url, {'ids': ids}, format='json'
+                )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_consistent(self):
+        self.assertEqual(set(reconcile_counters().values()), {0})
+        self.assertEqual(
+            sorted(ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            )),
+            sorted(AmountIngredient.objects.filter(
+                recipe__cart_recipe__isnull=False
+            ).values_list(
+                'recipe__cart_recipe__user_id', 'ingredient_id'
+            ).annotate(total=Sum('amount')).order_by())
+        )
+        self.assertFalse(FeedItem.objects.exclude(
+            author__in=Subscriptions.objects.filter(
+                user=self.user
+            ).values('author')
+        ).filter(user=self.user).exists())
+
+    def test_remove_queries_do_not_depend_on_size(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        author_ids = [author.id for author in self.authors]
+        for url, ids in (('/api/recipes/favorite/', recipe_ids),
+                         ('/api/recipes/shopping_cart/', recipe_ids),
+                         ('/api/users/subscribe/', author_ids)):
+            counts = []
+            for size in BULK_REMOVE_SIZES:
+                self.change('post', url, ids)
+                counts.append(self.change('delete', url, ids[:size]))
+                self.assert_consistent()
+            with self.subTest(url=url):
+                self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Cart.objects.filter(user=self.user).count(),
+                         len(recipe_ids) - max(BULK_REMOVE_SIZES))
@@ -0,0 +1,232 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (TestCase, TransactionTestCase,
+                         skipUnlessDBFeature)
+from rest_framework.test import APIClient
+
+from recipes.models import (AmountIngredient, Cart, FeedItem, Ingredient,
+                            Recipe, ShoppingListItem)
+from users.models import Subscriptions
+
+User = get_user_model()
+
+# Запросы с учётом SAVEPOINT и RELEASE транзакции внутри теста. Сама
+# запись — один INSERT или DELETE, к нему одно изменение счётчика и один
+# запрос к списку покупок или ленте. Удаление сначала читает запись
+# с блокировкой, удаление рецепта из списка запоминается для свёртки
+# популярности, а удаление из корзины ещё убирает обнулившиеся позиции.
+CART_ADD_QUERIES = 6
+CART_REMOVE_QUERIES = 8
+FAVORITE_ADD_QUERIES = 5
+FAVORITE_REMOVE_QUERIES = 6
+SUBSCRIBE_QUERIES = 7
+UNSUBSCRIBE_QUERIES = 6
+
+
+class ListWriteQueriesTest(TestCase):
+    """Число запросов при изменении избранного, корзины и подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=5, image='recipes/images/test.png', fanned_out=True
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe=cls.recipe, amount=10,
+                ingredient=Ingredient.objects.create(
+                    name=f'Ингредиент {number}', measurement_unit='г'
+                )
+            )
+            for number in range(3)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, queries, expected_status):
+        cache.clear()
+        with self.assertNumQueries(queries):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(url)
+        self.assertEqual(response.status_code, expected_status)
+        return response
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'total_amount'))
+
+    def test_recipe_list_queries(self):
+        for name, counter, add_queries, remove_queries in (
+            ('favorite', 'favorites_count', FAVORITE_ADD_QUERIES,
+             FAVORITE_REMOVE_QUERIES),
+            ('shopping_cart', 'cart_count', CART_ADD_QUERIES,
+             CART_REMOVE_QUERIES),
+        ):
+            url = f'/api/recipes/{self.recipe.id}/{name}/'
+            with self.subTest(url=url):
+                self.request('post', url, add_queries, 201)
+                self.recipe.refresh_from_db()
+                self.assertEqual(getattr(self.recipe, counter), 1)
+                self.request('delete', url, remove_queries, 204)
+                self.recipe.refresh_from_db()
+                self.assertEqual(getattr(self.recipe, counter), 0)
+        self.assertEqual(self.shopping_list(), {})
+
+    def test_subscription_queries(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        response = self.request('post', url, SUBSCRIBE_QUERIES, 201)
+        self.assertEqual(len(response.data['recipes']), 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assertTrue(FeedItem.objects.filter(user=self.user).exists())
+        self.request('delete', url, UNSUBSCRIBE_QUERIES, 204)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 0)
+        self.assertFalse(FeedItem.objects.filter(user=self.user).exists())
+
+    def test_double_submit_is_applied_once(self):
+        url = f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.cart_count, 1)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.shopping_list(), dict(
+            self.recipe.recipes.values_list('ingredient_id', 'amount')
+        ))
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assertEqual(
+            Subscriptions.objects.filter(user=self.user).count(), 1
+        )
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentDoubleSubmitTest(TransactionTestCase):
+    """Двойная отправка из двух параллельных запросов применяется раз."""
+
+    ROUNDS = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=5, image='recipes/images/test.png'
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe=self.recipe, amount=10,
+                ingredient=Ingredient.objects.create(
+                    name=f'Ингредиент {number}', measurement_unit='г'
+                )
+            )
+            for number in range(3)
+        )
+
+    def submit_twice(self, method, url, **kwargs):
+        barrier = threading.Barrier(2)
+        responses = []
+
+        def submit():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                responses.append(getattr(client, method)(url, **kwargs))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def statuses(self, method, url):
+        return sorted(response.status_code
+                      for response in self.submit_twice(method, url))
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'total_amount'))
+
+    def test_cart(self):
+        url = f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        lines = dict(
+            self.recipe.recipes.values_list('ingredient_id', 'amount')
+        )
+        for _ in range(self.ROUNDS):
+            self.assertEqual(self.statuses('post', url), [201, 400])
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.cart_count, 1)
+            self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+            self.assertEqual(self.shopping_list(), lines)
+            self.assertEqual(self.statuses('delete', url), [204, 400])
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.cart_count, 0)
+            self.assertFalse(Cart.objects.filter(user=self.user).exists())
+            self.assertEqual(self.shopping_list(), {})
+
+    def bulk_statuses(self, method):
+        return sorted(
+            response.data[0]['status']
+            for response in self.submit_twice(
+                method, '/api/recipes/shopping_cart/',
+                data={'ids': [self.recipe.id]}, format='json'
+            )
+        )
+
+    def test_bulk_cart(self):
+        lines = dict(
+            self.recipe.recipes.values_list('ingredient_id', 'amount')
+        )
+        for _ in range(self.ROUNDS):
+            self.assertEqual(self.bulk_statuses('post'), ['added', 'exists'])
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.cart_count, 1)
+            self.assertEqual(self.shopping_list(), lines)
+            self.assertEqual(self.bulk_statuses('delete'),
+                             ['missing', 'removed'])
+            self.recipe.refresh_from_db()
+            self.assertEqual(self.recipe.cart_count, 0)
+            self.assertEqual(self.shopping_list(), {})
+
+    def test_subscription(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        for _ in range(self.ROUNDS):
+            self.assertEqual(self.statuses('post', url), [201, 400])
+            self.author.refresh_from_db()
+            self.assertEqual(self.author.subscribers_count, 1)
+            self.assertEqual(
+                Subscriptions.objects.filter(user=self.user).count(), 1
+            )
+            self.assertEqual(
+                FeedItem.objects.filter(user=self.user).count(), 1
+            )
+            self.assertEqual(self.statuses('delete', url), [204, 400])
+            self.author.refresh_from_db()
+            self.assertEqual(self.author.subscribers_count, 0)
+            self.assertFalse(FeedItem.objects.filter(user=self.user).exists())
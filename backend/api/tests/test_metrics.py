@@ -0,0 +1,41 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase, override_settings
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+class RequestMetricsTest(TestCase):
+    """Учёт SQL-запросов в Server-Timing под WSGI и ASGI."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.url = '/api/recipes/{}/'.format(Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=5,
+            image='recipes/images/test.png'
+        ).id)
+
+    def setUp(self):
+        cache.clear()
+
+    def queries(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('app;dur=', response['Server-Timing'])
+        return int(QUERIES.search(response['Server-Timing']).group(1))
+
+    def test_sync_view_queries_are_recorded(self):
+        self.assertGreater(self.queries(Client().get(self.url)), 0)
+
+    async def test_sync_view_queries_are_recorded_under_asgi(self):
+        self.assertGreater(self.queries(await AsyncClient().get(self.url)),
+                           0)
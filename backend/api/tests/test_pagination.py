@@ -0,0 +1,74 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, RecipeScore
+
+User = get_user_model()
+
+BAD_CURSORS = (['abc', 'x'], [None, 1], [{'a': 1}, 2], [1, 2, 3], 'x')
+
+
+def encode(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class KeysetCursorTest(TestCase):
+    """Разбор курсора keyset-пагинации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        for number in range(3):
+            Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {number}', text='Описание',
+                cooking_time=5, image='recipes/images/test.png'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_next_cursor(self):
+        ids = []
+        url = '/api/recipes/?limit=2&cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(
+            ids, list(Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            ))
+        )
+
+    def test_invalid_cursor_is_not_found(self):
+        for url in ('/api/recipes/', '/api/recipes/feed/'):
+            for cursor in BAD_CURSORS:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(
+                        url, {'cursor': encode(cursor)}
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+    def test_popular_ordering_keeps_recipes_without_score(self):
+        RecipeScore.objects.filter(
+            recipe__in=Recipe.objects.order_by('id')[:2]
+        ).delete()
+        RecipeScore.objects.update(popular_score=1.0)
+        ids = []
+        url = '/api/recipes/?ordering=popular&limit=2&cursor='
+        while url:
+            response = self.client.get(url)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        scored = Recipe.objects.order_by('-id').filter(score__isnull=False)
+        unscored = Recipe.objects.order_by('-id').filter(score__isnull=True)
+        self.assertEqual(ids, [recipe.id for recipe in scored]
+                         + [recipe.id for recipe in unscored])
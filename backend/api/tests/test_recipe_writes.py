@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (AmountIngredient, Cart, Ingredient, Recipe,
+                            ShoppingListItem, Tag)
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+# На PostgreSQL после сохранения рецепта пересчитывается поисковый вектор.
+SEARCH_VECTOR_QUERIES = 1 if connection.vendor == 'postgresql' else 0
+CREATE_QUERIES = 19 + SEARCH_VECTOR_QUERIES
+UPDATE_QUERIES = 18 + SEARCH_VECTOR_QUERIES
+
+
+class RecipeWriteQueriesTest(TestCase):
+    """Число запросов при создании и изменении рецепта."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.buyer = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def payload(self, ingredients, amount=10):
+        return {
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': ingredient.id, 'amount': amount}
+                            for ingredient in ingredients],
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': IMAGE,
+        }
+
+    def create_recipe(self, ingredients):
+        recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=5, image='recipes/images/test.png'
+        )
+        recipe.tags.set(self.tags)
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        for count in (1, len(self.ingredients)):
+            with self.subTest(ingredients=count):
+                cache.clear()
+                with self.assertNumQueries(CREATE_QUERIES):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        response = self.client.post(
+                            '/api/recipes/',
+                            self.payload(self.ingredients[:count]),
+                            format='json'
+                        )
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(
+                    AmountIngredient.objects.filter(
+                        recipe_id=response.data['id']
+                    ).count(),
+                    count
+                )
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        for count in (2, len(self.ingredients) // 2):
+            with self.subTest(ingredients=count):
+                recipe = self.create_recipe(self.ingredients[:count])
+                Cart.objects.create(user=self.buyer, recipe=recipe)
+                payload = self.payload(
+                    self.ingredients[1:count + 2], amount=15
+                )
+                del payload['image']
+                cache.clear()
+                with self.assertNumQueries(UPDATE_QUERIES):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        response = self.client.patch(
+                            f'/api/recipes/{recipe.id}/', payload,
+                            format='json'
+                        )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    set(recipe.recipes.values_list('ingredient_id',
+                                                   'amount')),
+                    {(ingredient.id, 15)
+                     for ingredient in self.ingredients[1:count + 2]}
+                )
+                self.assertEqual(
+                    set(ShoppingListItem.objects.filter(
+                        user=self.buyer
+                    ).values_list('ingredient_id', 'total_amount')),
+                    {(ingredient.id, 15)
+                     for ingredient in self.ingredients[1:count + 2]}
+                )
+                Cart.objects.filter(recipe=recipe).delete()
+
+    def test_unknown_tag_and_ingredient_are_rejected(self):
+        missing = max(tag.id for tag in self.tags) + 1
+        payload = self.payload(self.ingredients[:1])
+        payload['tags'].append(missing)
+        response = self.client.post('/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
+        payload = self.payload(self.ingredients[:1])
+        payload['ingredients'].append(
+            {'id': self.ingredients[-1].id + 1, 'amount': 10}
+        )
+        response = self.client.post('/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.views import RecipeViewSet
+from recipes.cache import recipe_responses
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class ResponseCacheTest(TestCase):
+    """Кэш готовых ответов списка рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Старое название', text='Описание',
+            cooking_time=5, image='recipes/images/test.png'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_response_built_before_invalidation_is_not_served(self):
+        original = RecipeViewSet.get_serializer
+
+        def rename_during_request(view, recipes, *args, **kwargs):
+            recipes = list(recipes)
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                name='Новое название'
+            )
+            recipe_responses.invalidate()
+            return original(view, recipes, *args, **kwargs)
+
+        with mock.patch.object(RecipeViewSet, 'get_serializer',
+                               rename_during_request):
+            stale = self.client.get('/api/recipes/')
+        self.assertEqual(stale.json()[0]['name'], 'Старое название')
+        fresh = self.client.get('/api/recipes/')
+        self.assertEqual(fresh.json()[0]['name'], 'Новое название')
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class SearchHeadlineTest(TestCase):
+    """Фрагменты описания в результатах поиска рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        with cls.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                author=cls.author, name='Борщ', cooking_time=5,
+                image='recipes/images/test.png',
+                text='Сварите борщ <script>alert("борщ")</script> '
+                     '& подавайте'
+            )
+
+    def test_headline_escapes_recipe_text(self):
+        response = APIClient().get('/api/recipes/', {'search': 'борщ'})
+        self.assertEqual(response.status_code, 200)
+        headline = response.json()[0]['search_headline']
+        self.assertNotIn('<script>', headline)
+        self.assertIn('&lt;script&gt;', headline)
+        self.assertIn('&amp;', headline)
+        self.assertIn('<b>борщ</b>', headline)
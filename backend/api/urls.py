@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import async_urlpatterns
 from api.views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                       TagViewSet)
+                       TagViewSet, metrics)
 
 router_version1 = DefaultRouter()
 
@@ -23,9 +25,13 @@ router_version1.register(
     basename='users'
 )
 
+router_urls = router_version1.urls
+if settings.ASYNC_VIEWS:
+    router_urls = async_urlpatterns(router_urls)
 
 urlpatterns = [
-    path('', include(router_version1.urls)),
+    path('_metrics', metrics, name='metrics'),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path(r'auth/', include('djoser.urls.authtoken')),
     path('recipes/download_shopping_cart/', RecipeViewSet,
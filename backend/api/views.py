@@ -1,28 +1,100 @@
-import csv
+from hashlib import md5
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import (Count, Max, OuterRef, Prefetch, Subquery, Sum,
+                              prefetch_related_objects)
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import filters, status, viewsets
-from rest_framework.decorators import action
+from rest_framework import status, viewsets
+from rest_framework.decorators import (action, api_view,
+                                       permission_classes)
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from api.filter import RecipeFilter
-from api.pagination import CustomPaginator
+from api.filter import IngredientSearchFilter, RecipeFilter
+from api.metrics import render_metrics
+from api.mixins import CatalogMixin, ResponseCacheMixin
+from api.pagination import CustomPaginator, FeedPaginator
 from api.permissions import AdminOrReadOnly, AuthorAdminOrReadOnly
-from api.serializers import (AddToRecipeSerializer, CustomUserSerializer,
+from api.renderers import SHOPPING_LIST_RENDERERS
+from api.serializers import (AddToRecipeSerializer, BulkIdsSerializer,
+                             CookParamsSerializer, CustomUserSerializer,
                              IngredientSerializer, RecipeCreateSerializer,
-                             RecipeGetSerializer, SubscriptionsSerializer,
-                             TagSerializer)
+                             RecipeGetSerializer,
+                             RecommendationParamsSerializer,
+                             ShoppingListItemSerializer,
+                             SubscriptionsSerializer, TagSerializer,
+                             get_request_relations, overlay_relations)
+from recipes.cache import ingredient_catalog, recipe_responses, tag_catalog
+from recipes.lists import bulk_add, bulk_remove
 from recipes.models import (AmountIngredient, Cart, Favorites, Ingredient,
-                            Recipe, Tag)
+                            Recipe, ShoppingListItem, Tag)
+from recipes.recommendations import recipe_index
 from users.models import CustomUser, Subscriptions
 
+RECIPE_READ_ACTIONS = ('list', 'retrieve', 'feed', 'cook', 'similar')
+
+
+def add_list_entry(model, user, **target):
+    """Создаёт запись списка пользователя или возвращает None, если есть.
+
+    Счётчики, список покупок и ленту обновляют сигналы в той же
+    транзакции. Повторная запись отсекается уникальным ограничением,
+    в том числе при параллельных запросах.
+    """
+    try:
+        with transaction.atomic():
+            return model.objects.create(user=user, **target)
+    except IntegrityError:
+        return None
+
+
+def remove_list_entry(model, user, **target):
+    """Удаляет запись списка пользователя и сообщает, была ли она.
+
+    Запись блокируется при чтении, поэтому из параллельных запросов
+    удаление и его сигналы выполнит только один.
+    """
+    with transaction.atomic():
+        entry = model.objects.select_for_update().filter(
+            user=user, **target
+        ).first()
+        if entry is None:
+            return False
+        entry.delete()
+    return True
+
+
+def change_list_in_bulk(request, model, field, targets):
+    """Массово добавляет (POST) или удаляет (DELETE) записи списка.
+
+    Для каждого id из тела запроса возвращается статус: added или exists
+    при добавлении, removed или missing при удалении и not_found, если
+    такого объекта нет среди targets.
+    """
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    found = set(targets.filter(id__in=ids).values_list('id', flat=True))
+    if request.method == 'POST':
+        changed = bulk_add(model, request.user, field, found)
+        done, skipped = 'added', 'exists'
+    else:
+        changed = bulk_remove(model, request.user, field, found)
+        done, skipped = 'removed', 'missing'
+    return Response([
+        {'id': pk,
+         'status': (done if pk in changed
+                    else skipped if pk in found else 'not_found')}
+        for pk in ids
+    ])
+
 
 class CustomUserViewSet(UserViewSet):
     """ViewSet для управления пользовательскими данными."""
@@ -30,6 +102,27 @@ class CustomUserViewSet(UserViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly, ]
     pagination_class = CustomPaginator
 
+    def get_recipes_prefetch(self):
+        """Рецепты авторов подписок с учётом параметра recipes_limit."""
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:int(recipes_limit)]
+            ))
+        return Prefetch('author__recipes', queryset=recipes,
+                        to_attr='limited_recipes')
+
+    def get_subscriptions_queryset(self):
+        """Подписки пользователя с рецептами авторов и их количеством."""
+        return Subscriptions.objects.filter(
+            user=self.request.user
+        ).select_related('author').prefetch_related(
+            self.get_recipes_prefetch()
+        ).order_by('author__username')
+
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def me(self, request):
@@ -45,78 +138,109 @@ class CustomUserViewSet(UserViewSet):
         if user == author:
             return Response({'Нельзя подписаться на самого себя.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        subscription, created = Subscriptions.objects.get_or_create(
-            user=user, author=author
+        subscription = add_list_entry(Subscriptions, user, author=author)
+        if subscription is None:
+            return Response({'Вы уже подписаны на данного пользователя.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        prefetch_related_objects([subscription], self.get_recipes_prefetch())
+        serializer = SubscriptionsSerializer(
+            subscription,
+            context={'request': request},
+            is_subscribed=True
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post', 'delete'], url_path='subscribe',
+            permission_classes=[IsAuthenticated, ])
+    def bulk_subscribe(self, request):
+        return change_list_in_bulk(
+            request, Subscriptions, 'author',
+            CustomUser.objects.exclude(pk=request.user.pk)
         )
-        if created:
-            serializer = SubscriptionsSerializer(
-                subscription,
-                context={'request': request},
-                is_subscribed=True
-            )
-            return Response(serializer.data,
-                            status=status.HTTP_201_CREATED)
-        return Response({'Вы уже подписаны на данного пользователя.'},
-                        status=status.HTTP_400_BAD_REQUEST)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, **kwargs):
-        user = request.user
-        author = get_object_or_404(CustomUser, pk=self.kwargs['id'])
-        subscription = Subscriptions.objects.filter(user=user,
-                                                    author=author).first()
-        if subscription:
-            subscription.delete()
+        if remove_list_entry(Subscriptions, request.user,
+                             author_id=self.kwargs['id']):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(CustomUser, pk=self.kwargs['id'])
         return Response({'Вы не подписаны на данного пользователя.'},
                         status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        user = request.user
-        queryset = Subscriptions.objects.filter(user=user)
+        queryset = self.get_subscriptions_queryset()
         page = self.paginate_queryset(queryset)
-        serializer = SubscriptionsSerializer(page, many=True,
-                                             context={'request': request})
+        serializer = SubscriptionsSerializer(
+            queryset if page is None else page,
+            many=True,
+            context={'request': request},
+            is_subscribed=True
+        )
+        if page is None:
+            return Response(serializer.data)
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для управления тегами."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AdminOrReadOnly, ]
+    catalog = tag_catalog
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для управления ингредиентами."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('^name',)
-
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        name = self.request.query_params.get('name')
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-        return queryset
+    filter_backends = (IngredientSearchFilter,)
+    catalog = ingredient_catalog
+    catalog_bypass_params = (IngredientSearchFilter.search_param,)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """ViewSet для управления рецептами."""
 
     queryset = Recipe.objects.all()
+    response_cache = recipe_responses
+    user_filter_params = ('is_favorited', 'is_in_shopping_cart')
     permission_classes = [AuthorAdminOrReadOnly, ]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = CustomPaginator
 
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('author')
+        if self.action not in RECIPE_READ_ACTIONS:
+            return queryset
+        return queryset.defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipes',
+                queryset=AmountIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def overlay_user_data(self, data, request):
+        relations = get_request_relations({'request': request})
+        if isinstance(data, list):
+            recipes = data
+        elif 'results' in data:
+            recipes = data['results']
+        else:
+            recipes = [data]
+        for recipe in recipes:
+            overlay_relations(recipe, relations)
+        return data
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in RECIPE_READ_ACTIONS:
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
@@ -130,6 +254,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk=None):
         return self.add_to_list(request, pk, Cart)
 
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite',
+            permission_classes=[IsAuthenticated, ])
+    def bulk_favorite(self, request):
+        return change_list_in_bulk(request, Favorites, 'recipe',
+                                   Recipe.objects.all())
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart',
+            permission_classes=[IsAuthenticated, ])
+    def bulk_shopping_cart(self, request):
+        return change_list_in_bulk(request, Cart, 'recipe',
+                                   Recipe.objects.all())
+
     @favorite.mapping.delete
     def remove_from_favorites(self, request, pk=None):
         return self.remove_from_list(request, pk, Favorites)
@@ -144,21 +281,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
         except Recipe.DoesNotExist:
             return Response({'Такого рецепта не существует.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        serializer = AddToRecipeSerializer(recipe)
-        if model.objects.filter(user=request.user, recipe=recipe).exists():
+        if add_list_entry(model, request.user, recipe=recipe) is None:
             return Response({'Рецепт уже добавлен в список.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        model.objects.create(user=request.user, recipe=recipe)
+        serializer = AddToRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def remove_from_list(self, request, pk, model):
-        recipe = get_object_or_404(Recipe, id=pk)
-        if not model.objects.filter(user=request.user,
-                                    recipe=recipe).exists():
-            return Response({'Такого рецепта нет в списке.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        model.objects.filter(user=request.user, recipe=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if remove_list_entry(model, request.user, recipe_id=pk):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, id=pk)
+        return Response({'Такого рецепта нет в списке.'},
+                        status=status.HTTP_400_BAD_REQUEST)
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -168,32 +302,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPaginator()
+        page = paginator.paginate_queryset(self.get_queryset(), request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def get_ranked_response(self, ranking, fields):
+        """Ответ с рецептами в порядке ranking и их оценками.
+
+        ranking — кортежи из id рецепта и значений полей fields.
+        """
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, *_ in ranking]
+        )
+        ranked = []
+        for recipe_id, *values in ranking:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                for name, value in zip(fields, values):
+                    setattr(recipe, name, value)
+                ranked.append(recipe)
+        return Response(self.get_serializer(ranked, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        params = CookParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ranking = recipe_index.by_coverage(
+            params.validated_data['ingredients'],
+            params.validated_data['limit']
+        )
+        return self.get_ranked_response(ranking,
+                                        ('coverage', 'missing_count'))
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        params = RecommendationParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        ranking = recipe_index.similar(recipe.id,
+                                       params.validated_data['limit'])
+        return self.get_ranked_response(ranking, ('similarity',))
+
+    def get_shopping_list(self, request, renderer_format):
+        """Список покупок пользователя и его ETag для условных запросов."""
+        items = ShoppingListItem.objects.filter(user=request.user)
+        state = items.aggregate(
+            lines=Count('id'), updated=Max('updated'),
+            total=Sum('total_amount')
+        )
+        etag = quote_etag(md5(
+            f'{renderer_format}:{state}'.encode()
+        ).hexdigest())
+        return items, etag
+
+    def is_not_modified(self, request, etag):
+        return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def shopping_list(self, request):
+        items, etag = self.get_shopping_list(request, 'json')
+        if self.is_not_modified(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        serializer = ShoppingListItemSerializer(
+            items.select_related('ingredient').order_by('ingredient__name'),
+            many=True
+        )
+        return Response(serializer.data, headers={'ETag': etag})
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        final_list = {}
-        ingredient = AmountIngredient.objects.filter(
-            recipe__cart_recipe__user=request.user
-        ).values_list(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total_amount=Sum('amount'))
-        for item in ingredient:
-            if len(item) == 2:
-                name, measurement_unit = item
-                amount = 0
-            elif len(item) == 3:
-                name, measurement_unit, amount = item
-            else:
-                continue
-            final_list[name] = {
-                'measurement_unit': measurement_unit,
-                'amount': amount
-            }
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; '
-        'filename="shopping_cart.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Наименование ингредиента', 'Единица измерения',
-                         'Количество'])
-        for ingredient, info in final_list.items():
-            writer.writerow([ingredient, info['measurement_unit'],
-                             info['amount']])
+        renderer = request.accepted_renderer
+        items, etag = self.get_shopping_list(request, renderer.format)
+        if self.is_not_modified(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        rows = items.values_list(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount'
+        ).order_by('ingredient__name')
+        response = StreamingHttpResponse(
+            renderer.stream(rows.iterator()),
+            content_type=renderer.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
+        )
+        response['ETag'] = etag
         return response
+
+
+@api_view(('GET',))
+@permission_classes((IsAdminUser,))
+def metrics(request):
+    """Метрики запросов для Prometheus, только для администраторов."""
+    return HttpResponse(render_metrics(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,16 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi'
+
+
+def post_worker_init(worker):
+    """Запускает поток индекса рекомендаций до первых запросов."""
+    from recipes.recommendations import recipe_index
+    recipe_index.start()
@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from recipes.models import (AmountIngredient, Cart, Favorites, Ingredient,
-                            Recipe, Tag)
+from recipes.models import (AmountIngredient, Cart, FeedItem, Favorites,
+                            ImageJob, Ingredient, Recipe, RecipeScore,
+                            ShoppingListItem, Tag)
 
 admin.site.empty_value_display = 'Не задано'
 
@@ -21,9 +22,11 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time',
         'text',
         'image',
-        'count_favorites',
+        'image_status',
+        'favorites_count',
+        'cart_count',
     )
-    list_filter = ('name', 'author__username', 'tags__name',)
+    list_filter = ('name', 'author__username', 'tags__name', 'image_status',)
     list_editable = (
         'cooking_time',
         'text',
@@ -33,10 +36,6 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display_links = ('name',)
     inlines = (IngredientInline,)
 
-    @admin.display(description='В избранном')
-    def count_favorites(self, obj: Recipe):
-        return obj.favorites_recipe.count()
-
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -75,3 +74,33 @@ class CartAdmin(admin.ModelAdmin):
     """Администратор для модели Cart."""
 
     list_display = ('user', 'recipe',)
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    """Администратор для модели ImageJob."""
+
+    list_display = ('recipe', 'attempts', 'locked_until', 'created',)
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """Администратор для модели ShoppingListItem."""
+
+    list_display = ('user', 'ingredient', 'total_amount', 'updated',)
+    list_filter = ('user__username',)
+
+
+@admin.register(FeedItem)
+class FeedItemAdmin(admin.ModelAdmin):
+    """Администратор для модели FeedItem."""
+
+    list_display = ('user', 'recipe', 'author', 'pub_date',)
+    list_filter = ('user__username',)
+
+
+@admin.register(RecipeScore)
+class RecipeScoreAdmin(admin.ModelAdmin):
+    """Администратор для модели RecipeScore."""
+
+    list_display = ('recipe', 'popular_score', 'trending_score',)
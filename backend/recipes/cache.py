@@ -0,0 +1,118 @@
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from recipes.constants import (CATALOG_CACHE_TIMEOUT, CATALOG_LRU_SIZE,
+                               RECIPE_RESPONSE_CACHE_TIMEOUT,
+                               USER_RELATIONS_CACHE_TIMEOUT)
+from recipes.models import Cart, Favorites, Ingredient, Tag
+from users.models import Subscriptions
+
+UserRelations = namedtuple('UserRelations',
+                           ('favorites', 'cart', 'subscriptions'))
+EMPTY_RELATIONS = UserRelations(frozenset(), frozenset(), frozenset())
+
+
+class VersionedCache:
+    """Записи кэша Django, которые сбрасываются сменой версии.
+
+    Версия хранится в общем кэше, меняется при изменении данных и живёт
+    не дольше timeout, так что даже с LocMemCache в каждом процессе данные
+    не устаревают надолго.
+    """
+
+    def __init__(self, prefix, timeout):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.version_key = f'{prefix}:version'
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time(), self.timeout)
+            version = cache.get(self.version_key, time.time())
+        return version
+
+    def invalidate(self):
+        cache.set(self.version_key, time.time(), self.timeout)
+
+
+class Catalog(VersionedCache):
+    """Справочник, закэшированный в кэше Django и в LRU процесса."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.name = model._meta.model_name
+        super().__init__(f'catalog:{self.name}', CATALOG_CACHE_TIMEOUT)
+
+    def items(self):
+        return self._load(self.version())[0]
+
+    def get(self, pk):
+        return self._load(self.version())[1].get(pk)
+
+    def exists(self, pks):
+        by_id = self._load(self.version())[1]
+        return all(pk in by_id for pk in pks)
+
+    @lru_cache(maxsize=CATALOG_LRU_SIZE)
+    def _load(self, version):
+        data_key = f'catalog:{self.name}:{version}'
+        items = cache.get(data_key)
+        if items is None:
+            items = list(self.model.objects.values(*self.fields))
+            cache.set(data_key, items, CATALOG_CACHE_TIMEOUT)
+        return items, {item['id']: item for item in items}
+
+
+class ResponseCache(VersionedCache):
+    """Готовые ответы API, общие для всех анонимных пользователей.
+
+    Версию читают до построения ответа и сохраняют его под ней же, чтобы
+    ответ, собранный до инвалидации, не попал под новую версию.
+    """
+
+    def get(self, key, version):
+        return cache.get(f'{self.prefix}:{version}:{key}')
+
+    def set(self, key, version, value):
+        cache.set(f'{self.prefix}:{version}:{key}', value, self.timeout)
+
+
+tag_catalog = Catalog(Tag, ('id', 'name', 'color', 'slug'))
+ingredient_catalog = Catalog(Ingredient, ('id', 'name', 'measurement_unit'))
+recipe_responses = ResponseCache('responses:recipe',
+                                 RECIPE_RESPONSE_CACHE_TIMEOUT)
+
+
+def user_relations_cache(user_id):
+    return VersionedCache(f'relations:{user_id}',
+                          USER_RELATIONS_CACHE_TIMEOUT)
+
+
+def get_user_relations(user_id):
+    """Id рецептов в избранном и в корзине и id авторов в подписках."""
+    versioned = user_relations_cache(user_id)
+    key = f'{versioned.prefix}:{versioned.version()}'
+    relations = cache.get(key)
+    if relations is None:
+        relations = UserRelations(
+            frozenset(Favorites.objects.filter(
+                user_id=user_id
+            ).values_list('recipe_id', flat=True)),
+            frozenset(Cart.objects.filter(
+                user_id=user_id
+            ).values_list('recipe_id', flat=True)),
+            frozenset(Subscriptions.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True)),
+        )
+        cache.set(key, relations, USER_RELATIONS_CACHE_TIMEOUT)
+    return relations
+
+
+def invalidate_user_relations(user_id):
+    user_relations_cache(user_id).invalidate()
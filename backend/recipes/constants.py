@@ -6,3 +6,45 @@ TAG_SLUG_MAX = 200
 RECIPE_NAME_MAX = 200
 COOKING_TIME_DEFAULT = 0
 AMOUNT_DEFAULT = 0
+INGREDIENT_SEARCH_LIMIT = 20
+RECIPE_SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_FALLBACK_LIMIT = 200
+RECIPE_SEARCH_HEADLINE_CHARS = 200
+BULK_LIST_MAX = 100
+FEED_FANOUT_MAX = 1000
+FEED_BACKFILL_SIZE = 100
+ROLLUP_NAME_MAX = 50
+SCORE_FAVORITE_WEIGHT = 1.0
+SCORE_CART_WEIGHT = 1.5
+SCORE_POPULAR_HALF_LIFE = 60 * 60 * 24 * 30
+SCORE_TRENDING_HALF_LIFE = 60 * 60 * 24
+SCORE_MAX_DOUBLINGS = 256
+SCORE_ROLLUP_LAG = 60
+SCORE_UPDATE_BATCH = 500
+RECOMMENDATION_LIMIT_DEFAULT = 6
+RECOMMENDATION_LIMIT_MAX = 50
+RECOMMENDATION_INDEX_MAX_AGE = 60 * 60
+RECOMMENDATION_SYNC_INTERVAL = 10
+RECOMMENDATION_SYNC_LAG = 60
+MINHASH_SIZE = 64
+MINHASH_BANDS = 16
+CATALOG_CACHE_TIMEOUT = 60
+CATALOG_LRU_SIZE = 4
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60
+USER_RELATIONS_CACHE_TIMEOUT = 60
+IMAGE_MAX_SIZE = 1920
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_QUALITY = 85
+IMAGE_WEBP_QUALITY = 80
+IMAGE_STATUS_MAX = 10
+IMAGE_STATUS_PENDING = 'pending'
+IMAGE_STATUS_READY = 'ready'
+IMAGE_STATUS_FAILED = 'failed'
+IMAGE_STATUS_CHOICES = (
+    (IMAGE_STATUS_PENDING, 'Обрабатывается'),
+    (IMAGE_STATUS_READY, 'Готова'),
+    (IMAGE_STATUS_FAILED, 'Ошибка'),
+)
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_LOCK_TIMEOUT = 60 * 5
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Cart, Favorites, Recipe
+from users.models import Subscriptions
+
+User = get_user_model()
+
+# (модель-источник, поле связи, модель со счётчиком, поле счётчика)
+COUNTERS = (
+    (Favorites, 'recipe', Recipe, 'favorites_count'),
+    (Cart, 'recipe', Recipe, 'cart_count'),
+    (Recipe, 'author', User, 'recipes_count'),
+    (Subscriptions, 'author', User, 'subscribers_count'),
+)
+
+
+def change_counter(model, pks, field, delta):
+    """Атомарно меняет счётчик строк с id из pks на delta.
+
+    Счётчик не опускается ниже нуля.
+    """
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_counters(source, pks, delta):
+    """Меняет на delta счётчики записей source у строк с id из pks."""
+    for counter_source, _, target, field in COUNTERS:
+        if counter_source is source:
+            change_counter(target, pks, field, delta)
+
+
+def actual_count(source, relation):
+    """Подзапрос с реальным числом записей source для строки счётчика."""
+    return Coalesce(Subquery(
+        source.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def recount_counters(source, pks):
+    """Пересчитывает счётчики записей source у строк с id из pks."""
+    for counter_source, relation, target, field in COUNTERS:
+        if counter_source is source:
+            target.objects.filter(pk__in=pks).update(
+                **{field: actual_count(source, relation)}
+            )
+
+
+def reconcile_counters():
+    """Пересчитывает все счётчики и возвращает число исправленных строк."""
+    fixed = {}
+    for source, relation, target, field in COUNTERS:
+        actual = actual_count(source, relation)
+        fixed[f'{target._meta.model_name}.{field}'] = target.objects.exclude(
+            **{field: actual}
+        ).update(**{field: actual})
+    return fixed
@@ -0,0 +1,117 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from recipes.cache import recipe_responses
+from recipes.counters import reconcile_counters
+from recipes.feed import rebuild_feeds
+from recipes.models import (AmountIngredient, Cart, Favorites, Ingredient,
+                            Recipe, Tag)
+from recipes.scores import create_missing_scores
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscriptions
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+DATASET_IMAGE = 'recipes/images/benchmark.png'
+DATASET_INGREDIENTS = 500
+DATASET_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B672', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+@transaction.atomic
+def generate_dataset(prefix='bench', users=100, recipes=1000,
+                     ingredients_per_recipe=8, favorites_per_user=20,
+                     cart_per_user=5, subscriptions_per_user=10, seed=0):
+    """Создаёт воспроизводимый набор данных пакетными вставками.
+
+    Все записи помечаются префиксом, поэтому наборы с разными префиксами
+    можно создавать в одной базе. Теги и ингредиенты берутся из базы,
+    а если их нет, создаются.
+    """
+    rnd = random.Random(seed)
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in DATASET_TAGS
+        )
+    if not Ingredient.objects.exists():
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=f'{prefix} ингредиент {number}',
+                        measurement_unit='г')
+             for number in range(DATASET_INGREDIENTS)),
+            batch_size=BATCH_SIZE
+        )
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+    User.objects.bulk_create(
+        (User(username=f'{prefix}_{number}',
+              email=f'{prefix}_{number}@example.com',
+              first_name='Тест', last_name=str(number),
+              password='!')
+         for number in range(users)),
+        batch_size=BATCH_SIZE
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{prefix}_'
+    ).order_by('id').values_list('id', flat=True))
+
+    # Подписки создаются ниже, ленты из них собирает rebuild_feeds.
+    Recipe.objects.bulk_create(
+        (Recipe(name=f'{prefix} рецепт {number}',
+                text='Сгенерированный рецепт.',
+                cooking_time=rnd.randint(5, 180),
+                image=DATASET_IMAGE,
+                author_id=rnd.choice(user_ids),
+                fanned_out=True)
+         for number in range(recipes)),
+        batch_size=BATCH_SIZE
+    )
+    recipe_ids = list(Recipe.objects.filter(
+        author_id__in=user_ids
+    ).order_by('id').values_list('id', flat=True))
+    create_missing_scores()
+
+    RecipeTag = Recipe.tags.through
+    RecipeTag.objects.bulk_create(
+        (RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+         for recipe_id in recipe_ids
+         for tag_id in rnd.sample(tag_ids, rnd.randint(1, len(tag_ids)))),
+        batch_size=BATCH_SIZE
+    )
+    per_recipe = min(ingredients_per_recipe, len(ingredient_ids))
+    AmountIngredient.objects.bulk_create(
+        (AmountIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                          amount=rnd.randint(1, 500))
+         for recipe_id in recipe_ids
+         for ingredient_id in rnd.sample(ingredient_ids, per_recipe)),
+        batch_size=BATCH_SIZE
+    )
+    for model, per_user in ((Favorites, favorites_per_user),
+                            (Cart, cart_per_user)):
+        model.objects.bulk_create(
+            (model(user_id=user_id, recipe_id=recipe_id)
+             for user_id in user_ids
+             for recipe_id in rnd.sample(recipe_ids,
+                                         min(per_user, len(recipe_ids)))),
+            batch_size=BATCH_SIZE
+        )
+    per_user = min(subscriptions_per_user, len(user_ids))
+    Subscriptions.objects.bulk_create(
+        (Subscriptions(user_id=user_id, author_id=author_id)
+         for user_id in user_ids
+         for author_id in rnd.sample(user_ids, per_user)
+         if author_id != user_id),
+        batch_size=BATCH_SIZE
+    )
+    reconcile_counters()
+    rebuild_shopping_lists(user_ids)
+    rebuild_feeds(user_ids)
+    transaction.on_commit(recipe_responses.invalidate)
+    return user_ids, recipe_ids
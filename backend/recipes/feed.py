@@ -0,0 +1,121 @@
+from django.db import connection, transaction
+from django.db.models import Q
+
+from recipes.constants import FEED_BACKFILL_SIZE, FEED_FANOUT_MAX
+from recipes.models import FeedItem, Recipe
+from users.models import CustomUser, Subscriptions
+
+BATCH_SIZE = 1000
+
+
+@transaction.atomic(savepoint=False)
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора.
+
+    Рецепт рассылается, только если подписчиков не больше
+    FEED_FANOUT_MAX, и тогда отмечается fanned_out. Неразосланные рецепты
+    подмешиваются при чтении ленты, сколько бы подписчиков ни стало
+    у автора потом. Строка автора блокируется: подписка и отписка
+    обновляют в ней счётчик до изменения ленты, поэтому подписчик либо
+    попадает в выборку ниже, либо его backfill уже видит отметку.
+    """
+    if not CustomUser.objects.select_for_update().filter(
+        pk=recipe.author_id, subscribers_count__lte=FEED_FANOUT_MAX
+    ).exists():
+        return
+    subscribers = Subscriptions.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=recipe.id,
+                  author_id=recipe.author_id, pub_date=recipe.pub_date)
+         for user_id in subscribers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    Recipe.objects.filter(pk=recipe.pk).update(fanned_out=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора, на которого подписались.
+
+    Копируются только разосланные рецепты, остальные и так подмешиваются
+    при чтении. Строки выбираются и вставляются одним INSERT ... SELECT
+    на стороне базы.
+    """
+    quote = connection.ops.quote_name
+    item = FeedItem._meta
+    recipe = Recipe._meta
+    recipes = quote(recipe.db_table)
+    recipe_author = f'{recipes}.{quote(recipe.get_field("author").column)}'
+    pub_date = f'{recipes}.{quote(recipe.get_field("pub_date").column)}'
+    recipe_id = f'{recipes}.{quote(recipe.pk.column)}'
+    fanned_out = f'{recipes}.{quote(recipe.get_field("fanned_out").column)}'
+    columns = ', '.join(
+        quote(item.get_field(name).column)
+        for name in ('user', 'recipe', 'author', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(item.db_table)} ({columns}) '
+            f'SELECT %s, {recipe_id}, {recipe_author}, {pub_date} '
+            f'FROM {recipes} '
+            f'WHERE {recipe_author} = %s AND {fanned_out} = %s '
+            f'ORDER BY {pub_date} DESC, {recipe_id} DESC LIMIT %s '
+            f'ON CONFLICT DO NOTHING',
+            (user_id, author_id, True, FEED_BACKFILL_SIZE)
+        )
+
+
+def trim(user_id, author_ids):
+    """Убирает из ленты рецепты авторов, от которых отписались."""
+    FeedItem.objects.filter(user_id=user_id, author__in=author_ids).delete()
+
+
+def feed_entries(user_id, after, limit):
+    """Первые limit пар (дата публикации, id рецепта) ленты после after.
+
+    Строки ленты сливаются с неразосланными рецептами авторов из
+    подписок: они опубликованы, когда у автора было больше
+    FEED_FANOUT_MAX подписчиков. Оба запроса идут по индексам в порядке
+    ленты и ограничены limit.
+    """
+    items = FeedItem.objects.filter(user_id=user_id)
+    recipes = Recipe.objects.filter(
+        fanned_out=False,
+        author__in=Subscriptions.objects.filter(
+            user_id=user_id
+        ).values('author_id')
+    )
+    if after is not None:
+        pub_date, recipe_id = after
+        items = items.filter(Q(pub_date__lt=pub_date)
+                             | Q(pub_date=pub_date, recipe_id__lt=recipe_id))
+        recipes = recipes.filter(Q(pub_date__lt=pub_date)
+                                 | Q(pub_date=pub_date, id__lt=recipe_id))
+    entries = set(items.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit])
+    entries.update(recipes.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit])
+    return sorted(entries, reverse=True)[:limit]
+
+
+def rebuild_feeds(user_ids=None):
+    """Пересобирает ленты из подписок и возвращает число строк.
+
+    Отметки fanned_out не меняются: рецепты, которые не рассылались,
+    по-прежнему подмешиваются при чтении.
+    """
+    items = FeedItem.objects.all()
+    subscriptions = Subscriptions.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        subscriptions = subscriptions.filter(user_id__in=user_ids)
+    items.delete()
+    for user_id, author_id in subscriptions.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        backfill(user_id, author_id)
+    return items.count()
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import os
+import uuid
+import warnings
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from recipes.constants import (IMAGE_MAX_PIXELS, IMAGE_MAX_SIZE,
+                               IMAGE_QUALITY, IMAGE_VARIANT_WIDTHS,
+                               IMAGE_WEBP_QUALITY)
+
+VARIANTS_DIR = 'recipes/images/variants'
+UPLOADS_DIR = 'recipes/uploads'
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+INVALID_IMAGE_MESSAGE = 'Загрузите корректное изображение.'
+TOO_LARGE_IMAGE_MESSAGE = 'Слишком большое изображение.'
+
+
+def split_base64(data):
+    """Отделяет data:-заголовок от строки base64."""
+    if ';base64,' in data[:100]:
+        return data.split(';base64,', 1)[1]
+    return data
+
+
+def check_base64_image(data):
+    """Проверяет по первым байтам, что в base64 передана картинка.
+
+    Декодируется только начало строки, полная проверка выполняется
+    при обработке задачи.
+    """
+    if not data.isascii():
+        raise ValidationError(INVALID_IMAGE_MESSAGE)
+    try:
+        head = base64.b64decode(split_base64(data)[:24], validate=True)
+    except (binascii.Error, ValueError):
+        raise ValidationError(INVALID_IMAGE_MESSAGE)
+    if not head.startswith(SIGNATURES):
+        raise ValidationError(INVALID_IMAGE_MESSAGE)
+
+
+def save_upload(data):
+    """Сохраняет строку base64 без декодирования и возвращает её имя."""
+    return default_storage.save(
+        f'{UPLOADS_DIR}/{uuid.uuid4()}.b64',
+        ContentFile(split_base64(data).encode('ascii'))
+    )
+
+
+def decode_upload(name):
+    """Декодирует сохранённую строку base64 в нормализованную картинку."""
+    with default_storage.open(name, 'rb') as file:
+        try:
+            decoded = base64.b64decode(file.read())
+        except (binascii.Error, ValueError):
+            raise ValidationError(INVALID_IMAGE_MESSAGE)
+    return normalize_image(ContentFile(decoded, name=f'{uuid.uuid4()}'))
+
+
+def open_image(file):
+    """Открывает картинку, проверяя размеры до декодирования пикселей.
+
+    Предупреждение Pillow о «бомбе распаковки» считается ошибкой, как
+    и сама DecompressionBombError.
+    """
+    file.seek(0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            image = Image.open(file)
+        except (Image.DecompressionBombError,
+                Image.DecompressionBombWarning):
+            raise ValidationError(TOO_LARGE_IMAGE_MESSAGE)
+        except (UnidentifiedImageError, OSError):
+            raise ValidationError(INVALID_IMAGE_MESSAGE)
+        if image.width * image.height > IMAGE_MAX_PIXELS:
+            raise ValidationError(TOO_LARGE_IMAGE_MESSAGE)
+        try:
+            return ImageOps.exif_transpose(image)
+        except (Image.DecompressionBombError,
+                Image.DecompressionBombWarning):
+            raise ValidationError(TOO_LARGE_IMAGE_MESSAGE)
+        except (OSError, SyntaxError, ValueError):
+            raise ValidationError(INVALID_IMAGE_MESSAGE)
+
+
+def get_format(image):
+    """PNG для картинок с прозрачностью, иначе JPEG."""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        return 'PNG'
+    return 'JPEG'
+
+
+def encode(image, image_format):
+    """Сохраняет картинку в байты без EXIF и прочих метаданных."""
+    if image_format == 'JPEG':
+        image = image.convert('RGB')
+        options = {'quality': IMAGE_QUALITY, 'optimize': True,
+                   'progressive': True}
+    elif image_format == 'WEBP':
+        image = image.convert('RGBA' if get_format(image) == 'PNG' else 'RGB')
+        options = {'quality': IMAGE_WEBP_QUALITY, 'method': 4}
+    else:
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        options = {'optimize': True}
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def normalize_image(file):
+    """Уменьшает картинку до IMAGE_MAX_SIZE и удаляет метаданные."""
+    image = open_image(file)
+    image.thumbnail((IMAGE_MAX_SIZE, IMAGE_MAX_SIZE), Image.LANCZOS)
+    image_format = get_format(image)
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    return ContentFile(encode(image, image_format),
+                       name=f'{stem}.{EXTENSIONS[image_format]}')
+
+
+def generate_variants(image_file):
+    """Создаёт уменьшенные копии картинки и их WebP-версии.
+
+    Возвращает список вариантов от меньшего к большему, последний из них
+    соответствует самой картинке.
+    """
+    storage = image_file.storage
+    with storage.open(image_file.name, 'rb') as file:
+        image = open_image(file)
+        image.load()
+    image_format = get_format(image)
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+    variants = []
+    widths = [width for width in IMAGE_VARIANT_WIDTHS if width < image.width]
+    for width in widths + [image.width]:
+        variant = {'width': width, 'image': image_file.name}
+        resized = image
+        if width < image.width:
+            height = max(round(image.height * width / image.width), 1)
+            resized = image.resize((width, height), Image.LANCZOS)
+            variant['image'] = storage.save(
+                f'{VARIANTS_DIR}/{stem}-{width}.'
+                f'{EXTENSIONS[image_format]}',
+                ContentFile(encode(resized, image_format))
+            )
+        variant['webp'] = storage.save(
+            f'{VARIANTS_DIR}/{stem}-{width}.webp',
+            ContentFile(encode(resized, 'WEBP'))
+        )
+        variants.append(variant)
+    return variants
+
+
+def delete_variants(storage, variants):
+    """Удаляет файлы вариантов, не трогая саму картинку."""
+    for variant in variants:
+        for name in (variant['image'], variant['webp']):
+            if name != variants[-1]['image']:
+                storage.delete(name)
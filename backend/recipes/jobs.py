@@ -0,0 +1,124 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.constants import (IMAGE_JOB_LOCK_TIMEOUT, IMAGE_JOB_MAX_ATTEMPTS,
+                               IMAGE_STATUS_FAILED, IMAGE_STATUS_PENDING,
+                               IMAGE_STATUS_READY)
+from recipes.images import (decode_upload, delete_variants,
+                            generate_variants, save_upload)
+from recipes.models import ImageJob, Recipe
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_image(recipe, data):
+    """Ставит картинку рецепта в base64 в очередь на обработку."""
+    if recipe.image_status != IMAGE_STATUS_PENDING:
+        recipe.image_status = IMAGE_STATUS_PENDING
+        recipe.save(update_fields=('image_status',))
+    job = ImageJob.objects.create(recipe=recipe, upload=save_upload(data))
+    if settings.IMAGE_JOBS_EAGER:
+        run_job(job)
+        recipe.refresh_from_db(
+            fields=('image', 'image_variants', 'image_status')
+        )
+    return job
+
+
+def claim_job():
+    """Забирает самую старую свободную задачу, блокируя её на время работы.
+
+    Просроченная блокировка означает, что обработчик упал, и задача
+    выдаётся повторно.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = ImageJob.objects.select_for_update(skip_locked=True).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=IMAGE_JOB_LOCK_TIMEOUT)
+        job.save(update_fields=('attempts', 'locked_until'))
+    return job
+
+
+def run_job(job):
+    """Декодирует картинку, создаёт варианты и обновляет рецепт.
+
+    Ошибки в данных завершают задачу статусом failed, остальные ошибки
+    оставляют её в очереди до исчерпания попыток.
+    """
+    if ImageJob.objects.filter(recipe_id=job.recipe_id,
+                               id__gt=job.id).exists():
+        job.delete()
+        return True
+    try:
+        image = decode_upload(job.upload)
+        recipe = Recipe(pk=job.recipe_id)
+        recipe.image.save(image.name, image, save=False)
+        variants = generate_variants(recipe.image)
+    except ValidationError as error:
+        logger.warning('Картинка рецепта %s отклонена: %s',
+                       job.recipe_id, error)
+        finish_job(job, IMAGE_STATUS_FAILED)
+        return False
+    except Exception:
+        logger.exception('Ошибка обработки картинки рецепта %s',
+                         job.recipe_id)
+        if job.attempts >= IMAGE_JOB_MAX_ATTEMPTS:
+            finish_job(job, IMAGE_STATUS_FAILED)
+        return False
+    if not finish_job(job, IMAGE_STATUS_READY, recipe.image.name, variants):
+        delete_variants(recipe.image.storage, variants)
+        recipe.image.storage.delete(recipe.image.name)
+    return True
+
+
+@transaction.atomic
+def finish_job(job, status, image=None, variants=None):
+    """Сохраняет результат задачи, если она ещё актуальна, и удаляет её.
+
+    Задача неактуальна, если рецепт удалён или для него уже поставлена
+    более новая картинка.
+    """
+    recipe = Recipe.objects.select_for_update().filter(
+        pk=job.recipe_id
+    ).first()
+    outdated = (recipe is None
+                or recipe.image_jobs.filter(id__gt=job.id).exists())
+    job.delete()
+    if outdated:
+        return False
+    old_image = recipe.image.name
+    old_variants = recipe.image_variants
+    recipe.image_status = status
+    update_fields = ['image_status']
+    if image is not None:
+        recipe.image = image
+        recipe.image_variants = variants
+        update_fields += ['image', 'image_variants']
+    recipe.save(update_fields=update_fields)
+    if image is not None:
+        transaction.on_commit(lambda: delete_replaced_image(
+            recipe.image.storage, old_image, old_variants
+        ))
+    return True
+
+
+def delete_replaced_image(storage, name, variants):
+    """Удаляет прежнюю картинку рецепта и её варианты.
+
+    Сам файл удаляется, только если на него не ссылается другой рецепт:
+    в сгенерированных наборах данных картинка у всех рецептов одна.
+    """
+    delete_variants(storage, variants)
+    if name and not Recipe.objects.filter(image=name).exists():
+        storage.delete(name)
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.utils import timezone
+
+from recipes.models import AmountIngredient, Recipe
+from recipes.shopping_list import change_recipe_lines
+
+
+def lines_changed(recipe_id, deltas, ingredients_changed):
+    """Обновляет производные данные после изменения строк рецепта.
+
+    Единственное место, где поддерживаются списки покупок и отметка
+    о смене состава для индекса рекомендаций: его вызывают и сигналы
+    одиночных строк, и replace_lines для всего состава. deltas
+    сопоставляет id ингредиента и изменение количества.
+    """
+    change_recipe_lines(recipe_id, deltas)
+    if ingredients_changed:
+        Recipe.objects.filter(pk=recipe_id).update(
+            ingredients_updated=timezone.now()
+        )
+
+
+def delete_lines(recipe_id):
+    """Удаляет строки рецепта одним DELETE ... RETURNING без сигналов.
+
+    Возвращает прежний состав: количество по id ингредиента.
+    """
+    opts = AmountIngredient._meta
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {quote(opts.get_field("recipe").column)} = %s '
+            f'RETURNING {quote(opts.get_field("ingredient").column)}, '
+            f'{quote(opts.get_field("amount").column)}',
+            (recipe_id,)
+        )
+        return dict(cursor.fetchall())
+
+
+def replace_lines(recipe, amounts, created=False):
+    """Заменяет состав рецепта на amounts — количество по id ингредиента.
+
+    Прежние строки возвращает сам DELETE, поэтому отдельного чтения для
+    расчёта разницы нет, а новые вставляются одним INSERT. Для нового
+    рецепта удалять и пересчитывать нечего.
+    """
+    previous = {} if created else delete_lines(recipe.id)
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                         amount=amount)
+        for ingredient_id, amount in amounts.items()
+    )
+    if created:
+        return
+    deltas = {
+        ingredient_id: amounts.get(ingredient_id, 0)
+        - previous.get(ingredient_id, 0)
+        for ingredient_id in amounts.keys() | previous.keys()
+    }
+    lines_changed(
+        recipe.id,
+        {pk: delta for pk, delta in deltas.items() if delta},
+        amounts.keys() != previous.keys()
+    )
@@ -0,0 +1,152 @@
+from django.db import connection, transaction
+
+from recipes.cache import invalidate_user_relations
+from recipes.counters import change_counters
+from recipes.feed import backfill, trim
+from recipes.models import Cart, Favorites
+from recipes.scores import WEIGHTS, record_removals
+from recipes.shopping_list import add_recipes, remove_recipes
+from users.models import Subscriptions
+
+# Модель списка и поле, на которое ссылается её запись.
+LIST_FIELDS = {
+    Favorites: 'recipe',
+    Cart: 'recipe',
+    Subscriptions: 'author',
+}
+
+
+def entry_target(entry):
+    """id рецепта или автора, на который ссылается запись списка."""
+    return getattr(entry, f'{LIST_FIELDS[type(entry)]}_id')
+
+
+@transaction.atomic(savepoint=False)
+def entries_added(model, user_id, pks):
+    """Обновляет производные данные после добавления записей в список.
+
+    Единственное место, где поддерживаются счётчики, список покупок,
+    лента и кэш связей пользователя: его вызывают и сигналы одиночных
+    записей, и массовые изменения. pks — id рецептов или авторов, записи
+    о которых действительно появились.
+    """
+    change_counters(model, pks, 1)
+    if model is Cart:
+        add_recipes(user_id, pks)
+    if model is Subscriptions:
+        for author_id in pks:
+            backfill(user_id, author_id)
+    transaction.on_commit(lambda: invalidate_user_relations(user_id))
+
+
+@transaction.atomic(savepoint=False)
+def entries_removed(model, user_id, removed):
+    """Обновляет производные данные после удаления записей из списка.
+
+    removed сопоставляет id рецептов или авторов удалённых записей и даты
+    их добавления: по ним свёртка популярности вычитает вклад записей.
+    """
+    change_counters(model, removed, -1)
+    if model in WEIGHTS:
+        record_removals(model, removed)
+    if model is Cart:
+        remove_recipes(user_id, removed)
+    if model is Subscriptions:
+        trim(user_id, removed)
+    transaction.on_commit(lambda: invalidate_user_relations(user_id))
+
+
+def insert_entries(model, user_id, column, pks):
+    """Вставляет записи списка, пропуская уже существующие.
+
+    Возвращает значения column у строк, которые вставил именно этот
+    запрос: INSERT ... ON CONFLICT DO NOTHING RETURNING поддерживают
+    PostgreSQL и SQLite 3.35+, а bulk_create в Django 3.2 при
+    ignore_conflicts ничего не возвращает.
+    """
+    opts = model._meta
+    quote = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields
+              if not field.primary_key]
+    params = []
+    for pk in pks:
+        entry = model(user_id=user_id, **{column: pk})
+        params.extend(
+            field.get_db_prep_save(field.pre_save(entry, True), connection)
+            for field in fields
+        )
+    row = f'({", ".join(["%s"] * len(fields))})'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(opts.db_table)} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES {", ".join([row] * len(pks))} '
+            f'ON CONFLICT DO NOTHING RETURNING {quote(column)}',
+            params
+        )
+        return {value for value, in cursor.fetchall()}
+
+
+def delete_entries(model, user_id, column, pks):
+    """Удаляет записи списка одним DELETE ... RETURNING без сигналов.
+
+    Возвращает для строк, которые удалил именно этот запрос, значение
+    column и дату добавления записи (None, если модель её не хранит).
+    """
+    opts = model._meta
+    quote = connection.ops.quote_name
+    pub_date = 'NULL'
+    converters = ()
+    if any(field.name == 'pub_date' for field in opts.concrete_fields):
+        date_column = opts.get_field('pub_date').get_col(opts.db_table)
+        pub_date = quote(date_column.target.column)
+        converters = connection.ops.get_db_converters(date_column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {quote(opts.get_field("user").column)} = %s '
+            f'AND {quote(column)} IN ({", ".join(["%s"] * len(pks))}) '
+            f'RETURNING {quote(column)}, {pub_date}',
+            (user_id, *pks)
+        )
+        rows = cursor.fetchall()
+    removed = {}
+    for value, added in rows:
+        for converter in converters:
+            added = converter(added, date_column, connection)
+        removed[value] = added
+    return removed
+
+
+@transaction.atomic
+def bulk_add(model, user, field, pks):
+    """Добавляет в список пользователя записи с id из pks одним INSERT.
+
+    model — Favorites, Cart или Subscriptions, field — поле, на которое
+    ссылается запись (recipe или author). Вставка идёт без сигналов,
+    поэтому производные данные обновляются одним вызовом entries_added
+    для строк, которые действительно добавил этот запрос. Возвращает их
+    id.
+    """
+    if not pks:
+        return set()
+    added = insert_entries(model, user.id, f'{field}_id', pks)
+    if added:
+        entries_added(model, user.id, added)
+    return added
+
+
+@transaction.atomic
+def bulk_remove(model, user, field, pks):
+    """Удаляет из списка пользователя записи с id из pks одним DELETE.
+
+    Как и в bulk_add, производные данные обновляются одним вызовом
+    entries_removed для строк, которые удалил этот запрос. Возвращает
+    их id.
+    """
+    if not pks:
+        return set()
+    removed = delete_entries(model, user.id, f'{field}_id', pks)
+    if removed:
+        entries_removed(model, user.id, removed)
+    return set(removed)
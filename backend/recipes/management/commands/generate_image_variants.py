@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from recipes.images import delete_variants, generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий и WebP-версий картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты и для рецептов, у которых они есть.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only('id', 'image', 'image_variants')
+        if not options['force']:
+            recipes = recipes.filter(image_variants=[])
+        created = skipped = 0
+        for recipe in recipes.iterator():
+            old_variants = recipe.image_variants
+            try:
+                recipe.image_variants = generate_variants(recipe.image)
+            except (OSError, ValidationError) as error:
+                skipped += 1
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            recipe.save(update_fields=('image_variants',))
+            if old_variants:
+                delete_variants(recipe.image.storage, old_variants)
+            created += 1
+        self.stdout.write(
+            f'Варианты созданы для {created} рецептов, пропущено {skipped}.'
+        )
@@ -1,58 +1,91 @@
 import csv
+import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from progress.bar import IncrementalBar
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from progress.counter import Counter
 
+from recipes.cache import ingredient_catalog, recipe_responses, tag_catalog
 from recipes.models import Ingredient, Tag
 
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+TAG_FIELDS = ('name', 'color', 'slug')
+BATCH_SIZE = 1000
 
-def ingredient_create(row):
-    Ingredient.objects.get_or_create(
-        name=row[0],
-        measurement_unit=row[1]
-    )
 
-
-def tag_create(row):
-    Tag.objects.get_or_create(
-        name=row[0],
-        color=row[1],
-        slug=row[2]
-    )
+def read_rows(path, fields):
+    """Построчно читает CSV с заголовком или JSON-массив записей."""
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.endswith('.json'):
+            for item in json.load(file):
+                if isinstance(item, dict):
+                    yield tuple(item[field] for field in fields)
+                else:
+                    yield tuple(item[:len(fields)])
+            return
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            if row:
+                yield tuple(row[:len(fields)])
 
 
 class Command(BaseCommand):
     help = 'Загрузка ингредиентов и тегов в бд.'
 
-    def handle(self, *args, **options):
-        ingredient_path = os.path.join(settings.BASE_DIR,
-                                       'data/ingredients.csv')
-        with open(ingredient_path, 'r', encoding='utf-8') as file:
-            ingredient_reader = csv.reader(file)
-            ingredient_row_count = sum(1 for row in ingredient_reader)
-        with open(ingredient_path, 'r', encoding='utf-8') as file:
-            ingredient_reader = csv.reader(file)
-            ingredient_bar = IncrementalBar('ingredients.csv'.ljust(17),
-                                            max=ingredient_row_count)
-            next(ingredient_reader)
-            for row in ingredient_reader:
-                ingredient_bar.next()
-                ingredient_create(row)
-            ingredient_bar.finish()
-
-        tag_path = os.path.join(settings.BASE_DIR, 'data/tags.csv')
-        with open(tag_path, 'r', encoding='utf-8') as file:
-            tag_reader = csv.reader(file)
-            tag_row_count = sum(1 for row in tag_reader)
-        with open(tag_path, 'r', encoding='utf-8') as file:
-            tag_reader = csv.reader(file)
-            tag_bar = IncrementalBar('tags.csv'.ljust(17), max=tag_row_count)
-            next(tag_reader)
-            for row in tag_reader:
-                tag_bar.next()
-                tag_create(row)
-            tag_bar.finish()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(settings.BASE_DIR, 'data/ingredients.csv'),
+            help='Путь к CSV или JSON с ингредиентами.'
+        )
+        parser.add_argument(
+            '--tags',
+            default=os.path.join(settings.BASE_DIR, 'data/tags.csv'),
+            help='Путь к CSV или JSON с тегами.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном INSERT.'
+        )
 
+    def handle(self, *args, **options):
+        for path in (options['ingredients'], options['tags']):
+            if not os.path.isfile(path):
+                raise CommandError(f'Файл {path} не найден.')
+        self.load(Ingredient, options['ingredients'], INGREDIENT_FIELDS,
+                  options['batch_size'])
+        self.load(Tag, options['tags'], TAG_FIELDS, options['batch_size'])
+        ingredient_catalog.invalidate()
+        tag_catalog.invalidate()
+        recipe_responses.invalidate()
         self.stdout.write('Ингредиенты и теги успешно загружены.')
+
+    @transaction.atomic
+    def load(self, model, path, fields, batch_size):
+        counter = Counter(f'{os.path.basename(path)}: '.ljust(19))
+        rows = read_rows(path, fields)
+        total = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(
+                (model(**dict(zip(fields, row))) for row in batch),
+                ignore_conflicts=True
+            )
+            total += len(batch)
+            counter.next(len(batch))
+        counter.finish()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{path}: {total} строк за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с)'
+        )
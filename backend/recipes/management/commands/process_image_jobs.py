@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.jobs import claim_job, run_job
+
+POLL_INTERVAL = 2
+
+
+class Command(BaseCommand):
+    help = 'Обработка очереди картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать текущую очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help='Пауза в секундах, если очередь пуста.'
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                job = claim_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                if run_job(job):
+                    processed += 1
+                else:
+                    failed += 1
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            f'Обработано картинок: {processed}, с ошибкой: {failed}.'
+        )
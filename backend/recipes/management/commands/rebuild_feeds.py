@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок из подписок и рецептов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_feeds()
+        self.stdout.write(f'Ленты подписок пересобраны: {total} строк.')
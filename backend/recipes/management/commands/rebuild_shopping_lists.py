@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Пересборка списков покупок из корзин пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='id пользователя, можно указать несколько раз.'
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_shopping_lists(options['users'])
+        self.stdout.write(f'Списки покупок пересобраны: {total} позиций.')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.cache import recipe_responses
+from recipes.scores import rollup_scores
+
+
+class Command(BaseCommand):
+    help = 'Обновление популярности рецептов по новым добавлениям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать популярность по всем добавлениям с нуля.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять обновление с этой паузой в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        try:
+            while True:
+                close_old_connections()
+                processed = rollup_scores(full=full)
+                recipe_responses.invalidate()
+                self.stdout.write(f'Учтено добавлений: {processed}.')
+                if options['interval'] is None:
+                    break
+                full = False
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.dataset import generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Генерация воспроизводимого набора данных для нагрузочных замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench',
+                            help='Префикс имён пользователей и рецептов.')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя.')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в корзине на пользователя.')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Подписок на пользователя.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids, recipe_ids = generate_dataset(
+            prefix=options['prefix'],
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            favorites_per_user=options['favorites'],
+            cart_per_user=options['cart'],
+            subscriptions_per_user=options['subscriptions'],
+            seed=options['seed']
+        )
+        self.stdout.write(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)} '
+            f'за {time.monotonic() - started:.1f} с.'
+        )
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.3 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_auto_20240201_0952'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='amountingredient',
+            options={'ordering': ('recipe',), 'verbose_name': 'Ингредиенты в рецепте', 'verbose_name_plural': 'Ингредиенты в рецептах'},
+        ),
+        # Столбец ingredients_id уже существует, меняется только состояние.
+        # Автоматическая таблица прежнего ManyToManyField без through
+        # осталась в базе и не используется: строки рецепта хранятся
+        # в AmountIngredient.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP TABLE IF EXISTS recipes_recipe_ingredients',
+                    migrations.RunSQL.noop
+                ),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name='amountingredient',
+                    old_name='ingredients',
+                    new_name='ingredient',
+                ),
+                migrations.AlterField(
+                    model_name='amountingredient',
+                    name='ingredient',
+                    field=models.ForeignKey(db_column='ingredients_id', on_delete=django.db.models.deletion.CASCADE, related_name='ingredient', to='recipes.ingredient', verbose_name='Ингредиент'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='ingredients',
+                    field=models.ManyToManyField(related_name='recipes', through='recipes.AmountIngredient', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_recipe', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_user', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='favorites',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites_recipe', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='favorites',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites_user', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
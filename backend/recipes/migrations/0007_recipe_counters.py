@@ -0,0 +1,43 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counter(model, field, source, relation):
+    actual = Coalesce(Subquery(
+        source.objects.filter(**{relation: OuterRef('pk')}).order_by().values(
+            relation
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+    model.objects.update(**{field: actual})
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    fill_counter(Recipe, 'favorites_count',
+                 apps.get_model('recipes', 'Favorites'), 'recipe')
+    fill_counter(Recipe, 'cart_count',
+                 apps.get_model('recipes', 'Cart'), 'recipe')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:08
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаляет повторы (user, recipe) и пересчитывает счётчики рецептов."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name, field in (('Favorites', 'favorites_count'),
+                              ('Cart', 'cart_count')):
+        model = apps.get_model('recipes', model_name)
+        duplicates = model.objects.values('user', 'recipe').annotate(
+            first_id=Min('id'), total=Count('id')
+        ).filter(total__gt=1)
+        if not duplicates.exists():
+            continue
+        for row in duplicates:
+            model.objects.filter(
+                user=row['user'], recipe=row['recipe']
+            ).exclude(id=row['first_id']).delete()
+        Recipe.objects.update(**{field: Coalesce(Subquery(
+            model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe'
+            ).annotate(total=Count('pk')).values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_pub_date_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_for_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorites',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_for_favorites'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_filter_indexes_and_list_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Варианты картинки'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готова'), ('failed', 'Ошибка')], default='ready', editable=False, max_length=10, verbose_name='Статус картинки'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload', models.CharField(max_length=255, verbose_name='Загруженный файл')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Заблокирована до')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Задача обработки картинки',
+                'verbose_name_plural': 'Задачи обработки картинок',
+                'ordering': ('id',),
+            },
+        ),
+    ]
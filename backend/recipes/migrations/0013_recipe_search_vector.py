@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 12:10
+
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+CONFIG = 'russian'
+
+
+def fill_search_vectors(apps, schema_editor):
+    """GIN-индекс и векторы существующих рецептов, только для PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    AmountIngredient = apps.get_model('recipes', 'AmountIngredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ingredient_names = AmountIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    Recipe.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=CONFIG)
+        + SearchVector(Coalesce(Subquery(ingredient_names), Value('')),
+                       weight='B', config=CONFIG)
+        + SearchVector('text', weight='C', config=CONFIG)
+    ))
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_shopping_list_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_vectors, drop_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FEED_FANOUT_MAX = 1000
+FEED_BACKFILL_SIZE = 100
+
+
+def fill_feeds(apps, schema_editor):
+    """Последние рецепты авторов в лентах их подписчиков."""
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscriptions = apps.get_model('users', 'Subscriptions')
+    subscriptions = Subscriptions.objects.filter(
+        author__subscribers_count__lte=FEED_FANOUT_MAX
+    ).values_list('user_id', 'author_id')
+    for user_id, author_id in subscriptions.iterator():
+        recipes = Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', 'pub_date')[:FEED_BACKFILL_SIZE]
+        FeedItem.objects.bulk_create(
+            FeedItem(user_id=user_id, recipe_id=recipe_id,
+                     author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0013_recipe_search_vector'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ('user', '-pub_date', '-recipe'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
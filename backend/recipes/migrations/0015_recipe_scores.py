@@ -0,0 +1,66 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_scores(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    RecipeScore.objects.bulk_create(
+        (RecipeScore(recipe_id=pk)
+         for pk in Recipe.objects.values_list('pk', flat=True)),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_feed_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular_score', models.FloatField(default=0, verbose_name='Популярность')),
+                ('trending_score', models.FloatField(default=0, verbose_name='Набирает популярность')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('processed_until', models.DateTimeField(verbose_name='Обработано до')),
+                ('epoch', models.DateTimeField(verbose_name='Начало отсчёта затухания')),
+            ],
+            options={
+                'verbose_name': 'Отметка свёртки',
+                'verbose_name_plural': 'Отметки свёрток',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['pub_date'], name='cart_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorites',
+            index=models.Index(fields=['pub_date'], name='favorites_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-popular_score', '-recipe'], name='recipe_score_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipescore',
+            index=models.Index(fields=['-trending_score', '-recipe'], name='recipe_score_trending_idx'),
+        ),
+        migrations.RunPython(create_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def remove_duplicates(apps, schema_editor):
+    """Сливает повторы ингредиентов и строк ингредиентов в рецепте."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    AmountIngredient = apps.get_model('recipes', 'AmountIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    for row in Ingredient.objects.values('name', 'measurement_unit').annotate(
+        first_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1):
+        duplicates = Ingredient.objects.filter(
+            name=row['name'], measurement_unit=row['measurement_unit']
+        ).exclude(id=row['first_id'])
+        AmountIngredient.objects.filter(ingredient__in=duplicates).update(
+            ingredient_id=row['first_id']
+        )
+        for item in ShoppingListItem.objects.filter(
+            ingredient__in=duplicates
+        ):
+            target, _ = ShoppingListItem.objects.get_or_create(
+                user_id=item.user_id, ingredient_id=row['first_id']
+            )
+            ShoppingListItem.objects.filter(pk=target.pk).update(
+                total_amount=F('total_amount') + item.total_amount
+            )
+        duplicates.delete()
+    lines = AmountIngredient.objects.values('recipe', 'ingredient')
+    for row in lines.annotate(
+        first_id=Min('id'), total=Count('id'), amount=Sum('amount')
+    ).filter(total__gt=1):
+        AmountIngredient.objects.filter(
+            recipe=row['recipe'], ingredient=row['ingredient']
+        ).exclude(id=row['first_id']).delete()
+        AmountIngredient.objects.filter(id=row['first_id']).update(
+            amount=row['amount']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_ingredients_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='amountingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_for_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_for_ingredient'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.3 on 2026-10-18 07:34
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def mark_fanned_out(apps, schema_editor):
+    """Отмечает рецепты, которые уже есть в лентах.
+
+    Рецепт автора без подписчиков рассылать было некому, его тоже можно
+    копировать при подписке. Остальные подмешиваются при чтении ленты.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Recipe.objects.filter(
+        Q(Exists(FeedItem.objects.filter(recipe_id=OuterRef('pk'))))
+        | Q(author__subscribers_count=0)
+    ).update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_unique_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан в ленты'),
+        ),
+        migrations.RunPython(mark_fanned_out, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-pub_date', '-id'], name='recipe_not_fanned_out_idx'),
+        ),
+    ]
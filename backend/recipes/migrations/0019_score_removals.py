@@ -0,0 +1,37 @@
+# Generated by Django 3.2.3 on 2026-10-18 07:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_fanned_out'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата добавления')),
+                ('removed', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата удаления')),
+                ('recipe', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Удалённое добавление',
+                'verbose_name_plural': 'Удалённые добавления',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='scoreremoval',
+            index=models.Index(fields=['pub_date'], name='score_removal_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scoreremoval',
+            index=models.Index(fields=['removed'], name='score_removal_removed_idx'),
+        ),
+    ]
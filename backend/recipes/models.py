@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.utils import timezone
 
 from recipes.constants import (INGREDIENT_NAME_MAX,
                                MEASUREMENT_UNIT_MAX,
@@ -9,7 +11,11 @@ from recipes.constants import (INGREDIENT_NAME_MAX,
                                TAG_SLUG_MAX,
                                RECIPE_NAME_MAX,
                                COOKING_TIME_DEFAULT,
-                               AMOUNT_DEFAULT)
+                               AMOUNT_DEFAULT,
+                               IMAGE_STATUS_MAX,
+                               IMAGE_STATUS_CHOICES,
+                               IMAGE_STATUS_READY,
+                               ROLLUP_NAME_MAX)
 
 User = get_user_model()
 
@@ -66,6 +72,19 @@ class Recipe(models.Model):
                               default=None,
                               blank=False, null=False
                               )
+    image_variants = models.JSONField(
+        'Варианты картинки',
+        default=list,
+        blank=True,
+        editable=False
+    )
+    image_status = models.CharField(
+        'Статус картинки',
+        max_length=IMAGE_STATUS_MAX,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_STATUS_READY,
+        editable=False
+    )
     text = models.TextField('Описание', blank=False, null=False)
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -98,11 +117,46 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         blank=False, null=False
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    ingredients_updated = models.DateTimeField(
+        'Состав изменён',
+        default=timezone.now,
+        db_index=True,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разослан в ленты',
+        default=False,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='recipe_not_fanned_out_idx',
+                         condition=models.Q(fanned_out=False)),
+        )
 
     def __str__(self):
         return self.name
@@ -175,6 +229,16 @@ class Favorites(BaseListModel):
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_for_favorites',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('pub_date',),
+                         name='favorites_pub_date_idx'),
+        )
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe.name}'
@@ -186,6 +250,210 @@ class Cart(BaseListModel):
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзина'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_for_cart',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('pub_date',), name='cart_pub_date_idx'),
+        )
 
     def __str__(self) -> str:
         return f'{self.user.username} -> {self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    """Модель 'Ингредиент в списке покупок'.
+
+    Сумма ингредиента по всем рецептам в корзине пользователя, которая
+    поддерживается при изменении корзины и состава рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+        on_delete=models.CASCADE
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE
+    )
+    total_amount = models.PositiveBigIntegerField('Количество', default=0)
+    updated = models.DateTimeField('Изменён', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ('user', 'ingredient__name')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total_amount} {self.ingredient_id}'
+
+
+class FeedItem(models.Model):
+    """Модель 'Рецепт в ленте подписок'.
+
+    Строки создаются при публикации рецепта для каждого подписчика автора
+    и при подписке. Рецепты, опубликованные, когда у автора было больше
+    FEED_FANOUT_MAX подписчиков, сюда не попадают (Recipe.fanned_out
+    не отмечен) и подмешиваются при чтении ленты.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='feed',
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_items',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        ordering = ('user', '-pub_date', '-recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_item',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.recipe_id}'
+
+
+class RecipeScore(models.Model):
+    """Модель 'Популярность рецепта'.
+
+    Суммы весов добавлений в избранное и в корзину, затухающие с периодом
+    полураспада. Чтобы не пересчитывать затухание у всех строк, вклад
+    добавления хранится умноженным на 2 ** ((pub_date - epoch) / период),
+    где epoch лежит в RollupCheckpoint, поэтому порядок строк по счёту
+    совпадает с порядком по затухшему на текущий момент значению.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='score',
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    popular_score = models.FloatField('Популярность', default=0)
+    trending_score = models.FloatField('Набирает популярность', default=0)
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = (
+            models.Index(fields=('-popular_score', '-recipe'),
+                         name='recipe_score_popular_idx'),
+            models.Index(fields=('-trending_score', '-recipe'),
+                         name='recipe_score_trending_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular_score:.2f}'
+
+
+class ScoreRemoval(models.Model):
+    """Модель 'Удалённое добавление'.
+
+    Запись из избранного или корзины, удалённая после добавления. Свёртка
+    популярности учитывает добавление в окне его даты и вычитает его
+    в окне удаления, поэтому счета сходятся с полным пересчётом. Строки
+    удаляются, когда окно удаления обработано.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='+',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    weight = models.FloatField('Вес')
+    pub_date = models.DateTimeField('Дата добавления')
+    removed = models.DateTimeField('Дата удаления', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Удалённое добавление'
+        verbose_name_plural = 'Удалённые добавления'
+        indexes = (
+            models.Index(fields=('pub_date',),
+                         name='score_removal_pub_date_idx'),
+            models.Index(fields=('removed',),
+                         name='score_removal_removed_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: -{self.weight}'
+
+
+class RollupCheckpoint(models.Model):
+    """Модель 'Отметка свёртки': до какого момента обработаны события."""
+
+    name = models.CharField('Название', max_length=ROLLUP_NAME_MAX,
+                            unique=True)
+    processed_until = models.DateTimeField('Обработано до')
+    epoch = models.DateTimeField('Начало отсчёта затухания')
+
+    class Meta:
+        verbose_name = 'Отметка свёртки'
+        verbose_name_plural = 'Отметки свёрток'
+
+    def __str__(self):
+        return f'{self.name}: {self.processed_until}'
+
+
+class ImageJob(models.Model):
+    """Модель 'Задача обработки картинки'."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='image_jobs',
+        on_delete=models.CASCADE
+    )
+    upload = models.CharField('Загруженный файл', max_length=255)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    locked_until = models.DateTimeField('Заблокирована до', null=True,
+                                        blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача обработки картинки'
+        verbose_name_plural = 'Задачи обработки картинок'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.upload}'
@@ -0,0 +1,261 @@
+import copy
+import heapq
+import logging
+import random
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from recipes.constants import (MINHASH_BANDS, MINHASH_SIZE,
+                               RECOMMENDATION_INDEX_MAX_AGE,
+                               RECOMMENDATION_SYNC_INTERVAL,
+                               RECOMMENDATION_SYNC_LAG)
+from recipes.models import AmountIngredient, Recipe
+
+MINHASH_PRIME = (1 << 31) - 1
+MINHASH_SEED = 20240201
+ROWS_PER_BAND = MINHASH_SIZE // MINHASH_BANDS
+SCORE_DIGITS = 4
+POSTINGS = partial(array, 'I')
+
+logger = logging.getLogger(__name__)
+
+_random = random.Random(MINHASH_SEED)
+HASH_PARAMS = tuple(
+    (_random.randrange(1, MINHASH_PRIME), _random.randrange(MINHASH_PRIME))
+    for _ in range(MINHASH_SIZE)
+)
+
+
+def minhash(ingredients):
+    """MinHash-подпись множества id ингредиентов."""
+    return array('I', (
+        min((a * ingredient + b) % MINHASH_PRIME for ingredient in ingredients)
+        for a, b in HASH_PARAMS
+    ))
+
+
+def bands(signature):
+    for band in range(MINHASH_BANDS):
+        start = band * ROWS_PER_BAND
+        yield band, tuple(signature[start:start + ROWS_PER_BAND])
+
+
+def jaccard(first, second):
+    first, second = set(first), set(second)
+    return len(first & second) / len(first | second)
+
+
+class IndexSnapshot:
+    """Состав рецептов, обратный индекс и LSH-корзины на момент сборки.
+
+    Опубликованный снимок не меняется: синхронизация собирает из него
+    новый, копируя словари поверхностно, а массивы и корзины — только
+    затронутые изменёнными рецептами.
+    """
+
+    def __init__(self, previous=None):
+        self.synced_at = timezone.now()
+        if previous is None:
+            self.ingredients = {}
+            self.postings = {}
+            self.signatures = {}
+            self.buckets = {}
+            self.copied = None
+            self.built = time.monotonic()
+            return
+        self.ingredients = dict(previous.ingredients)
+        self.postings = dict(previous.postings)
+        self.signatures = dict(previous.signatures)
+        self.buckets = dict(previous.buckets)
+        self.copied = set()
+        self.built = previous.built
+
+    @classmethod
+    def build(cls):
+        """Собирает снимок по всем строкам рецептов."""
+        snapshot = cls()
+        lines = AmountIngredient.objects.order_by().values_list(
+            'recipe_id', 'ingredient_id'
+        )
+        compositions = {}
+        for recipe_id, ingredient_id in lines.iterator():
+            compositions.setdefault(recipe_id, []).append(ingredient_id)
+        for recipe_id, ingredients in compositions.items():
+            snapshot.add(recipe_id, ingredients)
+        return snapshot
+
+    def synced(self):
+        """Снимок с переиндексированными недавно изменёнными рецептами."""
+        since = self.synced_at - timedelta(seconds=RECOMMENDATION_SYNC_LAG)
+        synced_at = timezone.now()
+        changed = list(Recipe.objects.filter(
+            ingredients_updated__gt=since
+        ).values_list('id', flat=True))
+        if not changed:
+            snapshot = copy.copy(self)
+            snapshot.synced_at = synced_at
+            return snapshot
+        snapshot = IndexSnapshot(self)
+        snapshot.synced_at = synced_at
+        compositions = {}
+        for recipe_id, ingredient_id in AmountIngredient.objects.filter(
+            recipe_id__in=changed
+        ).order_by().values_list('recipe_id', 'ingredient_id'):
+            compositions.setdefault(recipe_id, []).append(ingredient_id)
+        for recipe_id in changed:
+            snapshot.remove(recipe_id)
+            if recipe_id in compositions:
+                snapshot.add(recipe_id, compositions[recipe_id])
+        return snapshot
+
+    def writable(self, name, key, factory):
+        """Значение self.<name>[key], которое можно менять в этом снимке.
+
+        Значения, доставшиеся от прежнего снимка, копируются при первом
+        изменении: прежний снимок в это время читают запросы.
+        """
+        mapping = getattr(self, name)
+        value = mapping.get(key)
+        if self.copied is None or (name, key) in self.copied:
+            if value is None:
+                value = mapping[key] = factory()
+            return value
+        self.copied.add((name, key))
+        value = mapping[key] = factory(() if value is None else value)
+        return value
+
+    def add(self, recipe_id, ingredients):
+        ingredients = array('I', sorted(set(ingredients)))
+        self.ingredients[recipe_id] = ingredients
+        for ingredient_id in ingredients:
+            self.writable('postings', ingredient_id, POSTINGS).append(
+                recipe_id
+            )
+        signature = minhash(ingredients)
+        self.signatures[recipe_id] = signature
+        for key in bands(signature):
+            self.writable('buckets', key, set).add(recipe_id)
+
+    def remove(self, recipe_id):
+        ingredients = self.ingredients.pop(recipe_id, None)
+        if ingredients is None:
+            return
+        for ingredient_id in ingredients:
+            self.writable('postings', ingredient_id, POSTINGS).remove(
+                recipe_id
+            )
+        for key in bands(self.signatures.pop(recipe_id)):
+            self.writable('buckets', key, set).discard(recipe_id)
+
+
+class RecipeIndex:
+    """Индекс рецептов по ингредиентам в памяти процесса.
+
+    Хранит состав каждого рецепта, обратный индекс «ингредиент → рецепты»
+    в массивах array('I') и MinHash-подписи с LSH-корзинами для поиска
+    похожих рецептов. Снимки собирает и публикует один фоновый поток:
+    раз в RECOMMENDATION_SYNC_INTERVAL секунд он подтягивает рецепты
+    с новым Recipe.ingredients_updated, а раз в
+    RECOMMENDATION_INDEX_MAX_AGE секунд собирает снимок заново, чтобы
+    вычистить удалённые. Запросы только читают опубликованный снимок,
+    без блокировок и обращений к базе; до первой сборки выдача пуста.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def start(self):
+        """Запускает фоновый поток индекса, если он ещё не работает."""
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            except DatabaseError:
+                logger.exception('Ошибка обновления индекса рекомендаций')
+            finally:
+                connection.close()
+            time.sleep(RECOMMENDATION_SYNC_INTERVAL)
+
+    def refresh(self):
+        """Публикует следующий снимок.
+
+        Если снимка нет или он старше RECOMMENDATION_INDEX_MAX_AGE,
+        снимок собирается заново, иначе синхронизируется прежний.
+        """
+        snapshot = self.snapshot
+        if (snapshot is None or time.monotonic() - snapshot.built
+                > RECOMMENDATION_INDEX_MAX_AGE):
+            self.snapshot = IndexSnapshot.build()
+        else:
+            self.snapshot = snapshot.synced()
+
+    def current(self):
+        """Опубликованный снимок или None, если он ещё не собран."""
+        if self.worker is None or not self.worker.is_alive():
+            self.start()
+        return self.snapshot
+
+    def by_coverage(self, ingredients, limit):
+        """Рецепты, для которых есть наибольшая доля ингредиентов.
+
+        Возвращает тройки (id рецепта, доля, число недостающих).
+        """
+        index = self.current()
+        if index is None:
+            return []
+        matched = Counter()
+        for ingredient_id in set(ingredients):
+            matched.update(index.postings.get(ingredient_id, ()))
+        best = heapq.nlargest(limit, (
+            (count / len(index.ingredients[recipe_id]), count, recipe_id)
+            for recipe_id, count in matched.items()
+        ))
+        return [
+            (recipe_id, round(coverage, SCORE_DIGITS),
+             len(index.ingredients[recipe_id]) - count)
+            for coverage, count, recipe_id in best
+        ]
+
+    def similar(self, recipe_id, limit):
+        """Похожие по составу рецепты с коэффициентом Жаккара.
+
+        Кандидаты берутся из общих LSH-корзин, а если их меньше limit —
+        из обратного индекса по ингредиентам рецепта.
+        """
+        index = self.current()
+        if index is None:
+            return []
+        ingredients = index.ingredients.get(recipe_id)
+        if ingredients is None:
+            return []
+        candidates = set()
+        for key in bands(index.signatures[recipe_id]):
+            candidates.update(index.buckets[key])
+        candidates.discard(recipe_id)
+        if len(candidates) < limit:
+            for ingredient_id in ingredients:
+                candidates.update(index.postings[ingredient_id])
+            candidates.discard(recipe_id)
+        best = heapq.nlargest(limit, (
+            (jaccard(ingredients, index.ingredients[candidate]), candidate)
+            for candidate in candidates
+        ))
+        return [(candidate, round(similarity, SCORE_DIGITS))
+                for similarity, candidate in best]
+
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from recipes.constants import (SCORE_CART_WEIGHT, SCORE_FAVORITE_WEIGHT,
+                               SCORE_MAX_DOUBLINGS, SCORE_POPULAR_HALF_LIFE,
+                               SCORE_ROLLUP_LAG, SCORE_TRENDING_HALF_LIFE,
+                               SCORE_UPDATE_BATCH)
+from recipes.models import (Cart, Favorites, Recipe, RecipeScore,
+                            RollupCheckpoint, ScoreRemoval)
+
+CHECKPOINT_NAME = 'recipe_scores'
+EVENTS = ((Favorites, SCORE_FAVORITE_WEIGHT), (Cart, SCORE_CART_WEIGHT))
+WEIGHTS = dict(EVENTS)
+HALF_LIVES = (('popular_score', SCORE_POPULAR_HALF_LIFE),
+              ('trending_score', SCORE_TRENDING_HALF_LIFE))
+
+
+def create_missing_scores():
+    RecipeScore.objects.bulk_create(
+        (RecipeScore(recipe_id=pk) for pk in Recipe.objects.filter(
+            score__isnull=True
+        ).values_list('pk', flat=True)),
+        ignore_conflicts=True
+    )
+
+
+def record_removals(model, added):
+    """Запоминает удалённые записи избранного или корзины для свёртки.
+
+    added сопоставляет id рецепта и дату добавления удалённой записи.
+    """
+    ScoreRemoval.objects.bulk_create(
+        ScoreRemoval(recipe_id=recipe_id, weight=WEIGHTS[model],
+                     pub_date=pub_date)
+        for recipe_id, pub_date in added.items()
+    )
+
+
+def rescale(checkpoint, epoch):
+    """Переносит начало отсчёта, чтобы множители не переполнили float."""
+    shift = (epoch - checkpoint.epoch).total_seconds()
+    RecipeScore.objects.update(**{
+        field: F(field) * 2 ** (-shift / half_life)
+        for field, half_life in HALF_LIVES
+    })
+    checkpoint.epoch = epoch
+
+
+def add_increments(increments):
+    """Прибавляет вклады к счетам, по одному UPDATE на пачку рецептов."""
+    recipe_ids = list(increments)
+    for start in range(0, len(recipe_ids), SCORE_UPDATE_BATCH):
+        batch = recipe_ids[start:start + SCORE_UPDATE_BATCH]
+        RecipeScore.objects.filter(recipe_id__in=batch).update(**{
+            field: F(field) + Case(
+                *[When(recipe_id=pk, then=Value(increments[pk][position]))
+                  for pk in batch],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+            for position, (field, _) in enumerate(HALF_LIVES)
+        })
+
+
+def window_events(since, until):
+    """Тройки (id рецепта, дата добавления, вес) событий из (since, until].
+
+    Удалённое добавление даёт два события: с весом в окне даты добавления
+    и с противоположным весом в окне даты удаления.
+    """
+    def window(queryset, field):
+        queryset = queryset.filter(**{f'{field}__lte': until})
+        if since is not None:
+            queryset = queryset.filter(**{f'{field}__gt': since})
+        return queryset.iterator()
+
+    for model, weight in EVENTS:
+        for recipe_id, pub_date in window(
+            model.objects.values_list('recipe_id', 'pub_date'), 'pub_date'
+        ):
+            yield recipe_id, pub_date, weight
+    removals = ScoreRemoval.objects.values_list('recipe_id', 'pub_date',
+                                                'weight')
+    yield from window(removals, 'pub_date')
+    for recipe_id, pub_date, weight in window(removals, 'removed'):
+        yield recipe_id, pub_date, -weight
+
+
+@transaction.atomic
+def rollup_scores(full=False):
+    """Добавляет к счетам рецептов события, появившиеся после отметки.
+
+    Добавления берутся из избранного и корзины, а удалённые — из
+    ScoreRemoval: их вклад прибавляется в окне даты добавления
+    и вычитается в окне даты удаления. События моложе SCORE_ROLLUP_LAG
+    секунд откладываются до следующего запуска, чтобы не потерять строки
+    из ещё не завершённых транзакций. При full счета пересчитываются
+    с нуля. Возвращает число событий.
+    """
+    until = timezone.now() - timedelta(seconds=SCORE_ROLLUP_LAG)
+    checkpoint = RollupCheckpoint.objects.select_for_update().filter(
+        name=CHECKPOINT_NAME
+    ).first()
+    since = None
+    if checkpoint is None or full:
+        RecipeScore.objects.update(popular_score=0, trending_score=0)
+        checkpoint = checkpoint or RollupCheckpoint(name=CHECKPOINT_NAME)
+        checkpoint.epoch = until
+    else:
+        since = checkpoint.processed_until
+        doublings = ((until - checkpoint.epoch).total_seconds()
+                     / SCORE_TRENDING_HALF_LIFE)
+        if doublings > SCORE_MAX_DOUBLINGS:
+            rescale(checkpoint, until)
+    create_missing_scores()
+    increments = defaultdict(lambda: [0.0] * len(HALF_LIVES))
+    processed = 0
+    for recipe_id, pub_date, weight in window_events(since, until):
+        offset = (pub_date - checkpoint.epoch).total_seconds()
+        for position, (_, half_life) in enumerate(HALF_LIVES):
+            increments[recipe_id][position] += (
+                weight * 2 ** (offset / half_life)
+            )
+        processed += 1
+    add_increments(increments)
+    ScoreRemoval.objects.filter(removed__lte=until).delete()
+    checkpoint.processed_until = until
+    checkpoint.save()
+    return processed
@@ -0,0 +1,34 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from recipes.constants import RECIPE_SEARCH_CONFIG
+from recipes.models import AmountIngredient, Recipe
+
+SEARCH_FIELDS = frozenset(('name', 'text'))
+
+
+def search_vector():
+    """Вектор рецепта: название важнее ингредиентов, ингредиенты — описания."""
+    ingredient_names = AmountIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=RECIPE_SEARCH_CONFIG)
+        + SearchVector(Coalesce(Subquery(ingredient_names), Value('')),
+                       weight='B', config=RECIPE_SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=RECIPE_SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Пересчитывает сохранённые поисковые векторы, только на PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        search_vector=search_vector()
+    )
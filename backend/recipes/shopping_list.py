@@ -0,0 +1,150 @@
+from django.db import connection, transaction
+from django.db.models import (BigIntegerField, Case, F, OuterRef, Subquery,
+                              Sum, Value, When)
+from django.db.models.functions import Greatest, Now
+
+from recipes.models import (AmountIngredient, Cart, Ingredient,
+                            ShoppingListItem)
+
+BATCH_SIZE = 1000
+
+
+def upsert_items(select, params):
+    """Прибавляет к спискам покупок строки, которые возвращает select.
+
+    select — SELECT пользователя, ингредиента и количества. Вставка идёт
+    через INSERT ... ON CONFLICT DO UPDATE: его поддерживают и PostgreSQL,
+    и SQLite 3.24+, а ORM Django 3.2 строить не умеет. Строки меняются
+    атомарно на стороне базы, поэтому параллельные изменения одного списка
+    не нужно сериализовать блокировками.
+    """
+    quote = connection.ops.quote_name
+    item = ShoppingListItem._meta
+    table = quote(item.db_table)
+    user, ingredient, total, updated = (
+        quote(item.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount', 'updated')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({user}, {ingredient}, {total}, {updated}) '
+            f'SELECT *, CURRENT_TIMESTAMP '
+            f'FROM ({select}) AS {quote("totals")} WHERE TRUE '
+            f'ON CONFLICT ({user}, {ingredient}) DO UPDATE SET '
+            f'{total} = {table}.{total} + excluded.{total}, '
+            f'{updated} = excluded.{updated}',
+            params
+        )
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def add_recipes(user_id, recipe_ids):
+    """Прибавляет состав рецептов к списку покупок пользователя.
+
+    Суммы по ингредиентам считаются и прибавляются одним запросом.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    quote = connection.ops.quote_name
+    line = AmountIngredient._meta
+    ingredient = quote(line.get_field('ingredient').column)
+    upsert_items(
+        f'SELECT %s, {ingredient}, '
+        f'SUM({quote(line.get_field("amount").column)}) '
+        f'FROM {quote(line.db_table)} '
+        f'WHERE {quote(line.get_field("recipe").column)} '
+        f'IN ({placeholders(recipe_ids)}) '
+        f'GROUP BY {ingredient}',
+        (user_id, *recipe_ids)
+    )
+
+
+def remove_recipes(user_id, recipe_ids):
+    """Вычитает состав рецептов из списка покупок пользователя.
+
+    Обнулившиеся позиции удаляются вторым запросом.
+    """
+    lines = AmountIngredient.objects.filter(recipe_id__in=recipe_ids)
+    ShoppingListItem.objects.filter(
+        user_id=user_id, ingredient__in=lines.values('ingredient_id')
+    ).update(
+        total_amount=Greatest(F('total_amount') - Subquery(
+            lines.filter(ingredient=OuterRef('ingredient')).order_by(
+            ).values('ingredient').annotate(
+                total=Sum('amount')
+            ).values('total'),
+            output_field=BigIntegerField()
+        ), Value(0)),
+        updated=Now()
+    )
+    ShoppingListItem.objects.filter(user_id=user_id, total_amount=0).delete()
+
+
+def change_recipe_lines(recipe_id, deltas):
+    """Обновляет списки покупок всех, у кого рецепт в корзине.
+
+    deltas сопоставляет id ингредиента и изменение количества.
+    Прибавки вносятся одним INSERT ... SELECT по корзинам, вычеты —
+    одним UPDATE, после которого удаляются обнулившиеся позиции.
+    """
+    added = {pk: delta for pk, delta in deltas.items() if delta > 0}
+    removed = {pk: -delta for pk, delta in deltas.items() if delta < 0}
+    if removed:
+        items = ShoppingListItem.objects.filter(
+            user_id__in=Cart.objects.filter(
+                recipe_id=recipe_id
+            ).values('user_id'),
+            ingredient_id__in=removed
+        )
+        items.update(
+            total_amount=Greatest(F('total_amount') - Case(
+                *[When(ingredient_id=pk, then=Value(amount))
+                  for pk, amount in removed.items()],
+                output_field=BigIntegerField()
+            ), Value(0)),
+            updated=Now()
+        )
+        items.filter(total_amount=0).delete()
+    if added:
+        quote = connection.ops.quote_name
+        cart = Cart._meta
+        ingredient = quote(Ingredient._meta.db_table)
+        upsert_items(
+            f'SELECT {quote(cart.get_field("user").column)}, '
+            f'{ingredient}.{quote("id")}, '
+            f'CASE {ingredient}.{quote("id")} '
+            f'{" ".join(["WHEN %s THEN %s"] * len(added))} END '
+            f'FROM {quote(cart.db_table)} CROSS JOIN {ingredient} '
+            f'WHERE {quote(cart.get_field("recipe").column)} = %s '
+            f'AND {ingredient}.{quote("id")} IN ({placeholders(added)})',
+            (*(value for item in added.items() for value in item),
+             recipe_id, *added)
+        )
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids=None):
+    """Пересобирает списки покупок из корзин и возвращает число позиций."""
+    items = ShoppingListItem.objects.all()
+    lines = AmountIngredient.objects.filter(recipe__cart_recipe__isnull=False)
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        lines = AmountIngredient.objects.filter(
+            recipe__cart_recipe__user_id__in=user_ids
+        )
+    items.delete()
+    totals = lines.values(
+        'recipe__cart_recipe__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=row['recipe__cart_recipe__user_id'],
+                          ingredient_id=row['ingredient_id'],
+                          total_amount=row['total'])
+         for row in totals.iterator()),
+        batch_size=BATCH_SIZE
+    )
+    return items.count()
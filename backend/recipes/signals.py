@@ -0,0 +1,146 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from recipes.cache import ingredient_catalog, recipe_responses, tag_catalog
+from recipes.counters import COUNTERS, change_counter
+from recipes.feed import fan_out
+from recipes.lines import lines_changed
+from recipes.lists import (LIST_FIELDS, entries_added, entries_removed,
+                           entry_target)
+from recipes.models import (AmountIngredient, Cart, Favorites, ImageJob,
+                            Ingredient, Recipe, RecipeScore, Tag)
+from recipes.search import SEARCH_FIELDS, update_search_vectors
+from users.models import CustomUser, Subscriptions
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_catalog(**kwargs):
+    transaction.on_commit(tag_catalog.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalog(**kwargs):
+    transaction.on_commit(ingredient_catalog.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=AmountIngredient)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_responses(**kwargs):
+    transaction.on_commit(recipe_responses.invalidate)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_recipe_responses_on_author_change(update_fields, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        transaction.on_commit(recipe_responses.invalidate)
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Subscriptions)
+def apply_added_entry(sender, instance, created, **kwargs):
+    if created:
+        entries_added(sender, instance.user_id, (entry_target(instance),))
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=Cart)
+@receiver(post_delete, sender=Subscriptions)
+def apply_removed_entry(sender, instance, **kwargs):
+    entries_removed(sender, instance.user_id, {
+        entry_target(instance): getattr(instance, 'pub_date', None)
+    })
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_feeds(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(instance, created, **kwargs):
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+
+
+@receiver(pre_save, sender=AmountIngredient)
+def remember_previous_line(instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_line = AmountIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=AmountIngredient)
+def apply_saved_line(instance, created, **kwargs):
+    deltas = {instance.ingredient_id: instance.amount}
+    previous = getattr(instance, '_previous_line', None)
+    ingredients_changed = created or previous is None
+    if not created and previous is not None:
+        ingredient_id, amount = previous
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+        ingredients_changed = ingredient_id != instance.ingredient_id
+    lines_changed(instance.recipe_id, deltas, ingredients_changed)
+
+
+@receiver(post_delete, sender=AmountIngredient)
+def apply_deleted_line(instance, **kwargs):
+    lines_changed(instance.recipe_id,
+                  {instance.ingredient_id: -instance.amount}, True)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(instance, update_fields, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        transaction.on_commit(lambda: update_search_vectors((instance.id,)))
+
+
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def update_search_vector_on_lines_change(instance, **kwargs):
+    transaction.on_commit(
+        lambda: update_search_vectors((instance.recipe_id,))
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def update_search_vectors_on_rename(instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: update_search_vectors(
+            Recipe.objects.filter(ingredients=instance).values('id')
+        ))
+
+
+@receiver(post_delete, sender=ImageJob)
+def delete_image_upload(instance, **kwargs):
+    transaction.on_commit(lambda: default_storage.delete(instance.upload))
+
+
+def connect_counter(source, relation, target, field):
+    """Подключает поддержку счётчика при создании и удалении записей."""
+
+    def increment(instance, created, **kwargs):
+        if created:
+            change_counter(target, (getattr(instance, f'{relation}_id'),),
+                           field, 1)
+
+    def decrement(instance, **kwargs):
+        change_counter(target, (getattr(instance, f'{relation}_id'),),
+                       field, -1)
+
+    post_save.connect(increment, sender=source, weak=False,
+                      dispatch_uid=f'{field}_increment')
+    post_delete.connect(decrement, sender=source, weak=False,
+                        dispatch_uid=f'{field}_decrement')
+
+
+# Счётчики записей списков меняет entries_added и entries_removed.
+for counter in COUNTERS:
+    if counter[0] not in LIST_FIELDS:
+        connect_counter(*counter)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.dataset import generate_dataset
+from recipes.feed import feed_entries, rebuild_feeds
+from recipes.models import FeedItem, Recipe
+from users.models import Subscriptions
+
+User = get_user_model()
+
+
+def feeds():
+    return sorted(FeedItem.objects.values_list('user_id', 'recipe_id'))
+
+
+class FeedTest(TestCase):
+    """Ленты подписок для данных, созданных пакетными вставками."""
+
+    def test_generated_dataset_has_feeds(self):
+        generate_dataset(prefix='test', users=5, recipes=20,
+                         subscriptions_per_user=3)
+        generated = feeds()
+        rebuild_feeds()
+        self.assertTrue(generated)
+        self.assertEqual(generated, feeds())
+
+
+@mock.patch('recipes.feed.FEED_FANOUT_MAX', 1)
+class FanOutThresholdTest(TestCase):
+    """Лента, когда число подписчиков автора переходит порог рассылки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{number}', password='pass',
+                email=f'reader{number}@example.com'
+            )
+            for number in range(3)
+        ]
+
+    def subscribe(self, reader):
+        Subscriptions.objects.create(user=reader, author=self.author)
+
+    def publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author=self.author, name='Рецепт', text='Описание',
+                cooking_time=5, image='recipes/images/test.png'
+            ).id
+
+    def feed(self, reader):
+        return [recipe_id for _, recipe_id in feed_entries(reader.id,
+                                                           None, 10)]
+
+    def test_recipes_survive_threshold_crossings(self):
+        first, second, third = self.readers
+        self.subscribe(first)
+        self.subscribe(second)
+        above = self.publish()
+        Subscriptions.objects.filter(user=second).delete()
+        below = self.publish()
+        self.assertEqual(self.feed(first), [below, above])
+        self.subscribe(second)
+        self.subscribe(third)
+        above_again = self.publish()
+        expected = [above_again, below, above]
+        for reader in self.readers:
+            with self.subTest(reader=reader.username):
+                self.assertEqual(self.feed(reader), expected)
+        self.assertEqual(
+            set(FeedItem.objects.values_list('recipe_id', flat=True)),
+            {below}
+        )
+        rebuild_feeds()
+        self.assertEqual(self.feed(third), expected)
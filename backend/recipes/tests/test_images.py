@@ -0,0 +1,93 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.constants import IMAGE_STATUS_READY
+from recipes.images import open_image
+from recipes.jobs import enqueue_image
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class OpenImageTest(TestCase):
+    """Проверка картинки перед декодированием пикселей."""
+
+    def test_decompression_bomb_is_invalid(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 10):
+            for size in (4, 5):
+                with self.subTest(pixels=size * size):
+                    with self.assertRaises(ValidationError):
+                        open_image(ContentFile(png(size, size)))
+        self.assertEqual(open_image(ContentFile(png(5, 5))).size, (5, 5))
+
+
+class ImageJobTest(TestCase):
+    """Замена картинки рецепта обработчиком задач."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root, IMAGE_JOBS_EAGER=True
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=5,
+            image='recipes/images/test.png'
+        )
+
+    def replace_image(self):
+        data = base64.b64encode(png(2000, 1000)).decode()
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_image(self.recipe, f'data:image/png;base64,{data}')
+        self.assertEqual(self.recipe.image_status, IMAGE_STATUS_READY)
+        return self.recipe.image.name, [
+            name for variant in self.recipe.image_variants
+            for name in (variant['image'], variant['webp'])
+        ]
+
+    def test_replaced_image_files_are_deleted(self):
+        first, first_variants = self.replace_image()
+        self.assertTrue(all(map(default_storage.exists, first_variants)))
+        second, second_variants = self.replace_image()
+        self.assertNotEqual(first, second)
+        self.assertFalse(any(map(default_storage.exists, first_variants)))
+        self.assertTrue(all(map(default_storage.exists, second_variants)))
+
+    def test_shared_image_is_kept(self):
+        default_storage.save('recipes/images/test.png',
+                             ContentFile(png(1, 1)))
+        shared = Recipe.objects.create(
+            author=self.recipe.author, name='Рецепт', text='Описание',
+            cooking_time=5, image='recipes/images/test.png'
+        )
+        self.replace_image()
+        self.assertTrue(default_storage.exists(shared.image.name))
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.constants import RECOMMENDATION_INDEX_MAX_AGE
+from recipes.models import AmountIngredient, Ingredient, Recipe
+from recipes.recommendations import IndexSnapshot, RecipeIndex
+
+User = get_user_model()
+
+
+class RecipeIndexTest(TestCase):
+    """Сборка и пересборка индекса рекомендаций."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=5,
+            image='recipes/images/test.png'
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=cls.recipe, ingredient=ingredient,
+                             amount=10)
+            for ingredient in cls.ingredients[:2]
+        )
+
+    def setUp(self):
+        self.index = RecipeIndex()
+        patcher = mock.patch.object(self.index, 'start')
+        self.start = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_do_not_build_the_index(self):
+        ids = [self.ingredients[0].id]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.by_coverage(ids, 5), [])
+            self.assertEqual(self.index.similar(self.recipe.id, 5), [])
+        self.start.assert_called_with()
+        self.index.refresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.by_coverage(ids, 5),
+                             [(self.recipe.id, 0.5, 1)])
+
+    def test_sync_publishes_a_new_snapshot(self):
+        self.index.refresh()
+        snapshot = self.index.snapshot
+        AmountIngredient.objects.create(recipe=self.recipe,
+                                        ingredient=self.ingredients[2],
+                                        amount=10)
+        ids = [self.ingredients[2].id]
+        self.assertEqual(self.index.by_coverage(ids, 5), [])
+        self.index.refresh()
+        self.assertIsNot(self.index.snapshot, snapshot)
+        self.assertEqual(self.index.by_coverage(ids, 5),
+                         [(self.recipe.id, 0.3333, 2)])
+        self.assertEqual(len(snapshot.ingredients[self.recipe.id]), 2)
+        self.assertNotIn(self.recipe.id,
+                         snapshot.postings.get(self.ingredients[2].id, ()))
+        self.assertEqual(self.index.snapshot.built, snapshot.built)
+
+    def test_stale_snapshot_is_rebuilt(self):
+        self.index.refresh()
+        snapshot = self.index.snapshot
+        snapshot.built -= RECOMMENDATION_INDEX_MAX_AGE + 1
+        with mock.patch.object(IndexSnapshot, 'build',
+                               wraps=IndexSnapshot.build) as build:
+            self.index.refresh()
+        build.assert_called_once_with()
+        self.assertGreater(self.index.snapshot.built, snapshot.built)
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.lists import bulk_remove
+from recipes.models import (Cart, Favorites, Recipe, RecipeScore,
+                            RollupCheckpoint, ScoreRemoval)
+from recipes.scores import CHECKPOINT_NAME, HALF_LIVES, rollup_scores
+
+User = get_user_model()
+
+
+@mock.patch('recipes.scores.SCORE_ROLLUP_LAG', 0)
+class RollupScoresTest(TestCase):
+    """Пошаговая свёртка популярности против полного пересчёта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{number}', password='pass',
+                email=f'reader{number}@example.com'
+            )
+            for number in range(2)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=5, image='recipes/images/test.png'
+            )
+            for number in range(2)
+        ]
+
+    def scores(self):
+        rows = RecipeScore.objects.values_list(
+            'recipe_id', 'popular_score', 'trending_score'
+        )
+        return {recipe_id: scores for recipe_id, *scores in rows}
+
+    def epoch(self):
+        return RollupCheckpoint.objects.get(name=CHECKPOINT_NAME).epoch
+
+    def assert_matches_full_rollup(self):
+        incremental = self.scores()
+        epoch = self.epoch()
+        rollup_scores(full=True)
+        full = self.scores()
+        shift = (epoch - self.epoch()).total_seconds()
+        self.assertEqual(incremental.keys(), full.keys())
+        for recipe_id, values in full.items():
+            for incremental_value, full_value, (_, half_life) in zip(
+                incremental[recipe_id], values, HALF_LIVES
+            ):
+                self.assertAlmostEqual(
+                    incremental_value * 2 ** (shift / half_life),
+                    full_value, places=9
+                )
+
+    def test_removals_are_subtracted(self):
+        first, second = self.recipes
+        reader, other = self.readers
+        Favorites.objects.create(user=reader, recipe=first)
+        Cart.objects.create(user=reader, recipe=first)
+        Favorites.objects.create(user=other, recipe=second)
+        rollup_scores()
+        Favorites.objects.filter(user=reader, recipe=first).delete()
+        Cart.objects.create(user=other, recipe=second)
+        Cart.objects.filter(user=other, recipe=second).delete()
+        rollup_scores()
+        self.assertGreater(self.scores()[first.id][0], 0)
+        self.assert_matches_full_rollup()
+        self.assertFalse(ScoreRemoval.objects.exists())
+        Cart.objects.filter(user=reader, recipe=first).delete()
+        rollup_scores()
+        self.assertAlmostEqual(self.scores()[first.id][0], 0, places=6)
+        self.assert_matches_full_rollup()
+
+    def test_bulk_removals_are_subtracted(self):
+        reader = self.readers[0]
+        for recipe in self.recipes:
+            Favorites.objects.create(user=reader, recipe=recipe)
+        rollup_scores()
+        bulk_remove(Favorites, reader, 'recipe',
+                    [recipe.id for recipe in self.recipes])
+        rollup_scores()
+        for recipe in self.recipes:
+            self.assertAlmostEqual(self.scores()[recipe.id][0], 0, places=6)
+        self.assert_matches_full_rollup()
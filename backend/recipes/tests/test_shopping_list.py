@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.test import TestCase
+
+from recipes.dataset import generate_dataset
+from recipes.models import (AmountIngredient, Cart, Ingredient, Recipe,
+                            ShoppingListItem)
+
+User = get_user_model()
+
+
+def shopping_lists():
+    return sorted(ShoppingListItem.objects.values_list(
+        'user_id', 'ingredient_id', 'total_amount'
+    ))
+
+
+def expected_shopping_lists():
+    return sorted(AmountIngredient.objects.filter(
+        recipe__cart_recipe__isnull=False
+    ).values_list(
+        'recipe__cart_recipe__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by())
+
+
+class ShoppingListTest(TestCase):
+    """Поддержка списков покупок при изменении данных в обход API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        )
+        cls.salt, cls.sugar, cls.flour = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар', 'мука')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Тесто', text='Описание', cooking_time=5,
+            image='recipes/images/test.png'
+        )
+        AmountIngredient.objects.create(recipe=cls.recipe,
+                                        ingredient=cls.salt, amount=5)
+        AmountIngredient.objects.create(recipe=cls.recipe,
+                                        ingredient=cls.sugar, amount=10)
+        Cart.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def test_line_edits_update_shopping_lists(self):
+        line = AmountIngredient.objects.get(recipe=self.recipe,
+                                            ingredient=self.salt)
+        line.amount = 7
+        line.save()
+        self.assertEqual(shopping_lists(), expected_shopping_lists())
+        line.ingredient = self.flour
+        line.save()
+        self.assertEqual(shopping_lists(), expected_shopping_lists())
+
+    def test_generated_dataset_has_shopping_lists(self):
+        generate_dataset(prefix='test', users=5, recipes=20, cart_per_user=3)
+        self.assertEqual(shopping_lists(), expected_shopping_lists())
@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.db.models import Count
 
 from users.models import CustomUser, Subscriptions
 
@@ -14,8 +13,8 @@ class UserAdmin(UserAdmin):
         'email',
         'first_name',
         'last_name',
-        'get_subscriptions_count',
-        'get_recipes_count',
+        'recipes_count',
+        'subscribers_count',
     )
     list_editable = (
         'email',
@@ -25,22 +24,6 @@ class UserAdmin(UserAdmin):
     list_filter = ('first_name', 'email')
     list_display_links = ('username',)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(
-            subscriptions_count=Count('subscriptions'),
-            recipes_count=Count('recipes', distinct=True)
-        )
-        return queryset
-
-    def get_subscriptions_count(self, obj):
-        return obj.subscriptions_count
-    get_subscriptions_count.short_description = 'Subscriptions count'
-
-    def get_recipes_count(self, obj):
-        return obj.recipes_count
-    get_recipes_count.short_description = 'Recipes count'
-
 
 @admin.register(Subscriptions)
 class SubscriptionsAdmin(admin.ModelAdmin):
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True, verbose_name='Адрес электронной почты'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='password',
+            field=models.CharField(max_length=128, verbose_name='password'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counter(model, field, source, relation):
+    actual = Coalesce(Subquery(
+        source.objects.filter(**{relation: OuterRef('pk')}).order_by().values(
+            relation
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+    model.objects.update(**{field: actual})
+
+
+def fill_counters(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    fill_counter(CustomUser, 'recipes_count',
+                 apps.get_model('recipes', 'Recipe'), 'author')
+    fill_counter(CustomUser, 'subscribers_count',
+                 apps.get_model('users', 'Subscriptions'), 'author')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_counters'),
+        ('users', '0002_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
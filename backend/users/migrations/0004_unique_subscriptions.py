@@ -0,0 +1,30 @@
+# Generated by Django 3.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаляет повторы подписок (author, user)."""
+    Subscriptions = apps.get_model('users', 'Subscriptions')
+    for row in Subscriptions.objects.values('author', 'user').annotate(
+        first_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1):
+        Subscriptions.objects.filter(
+            author=row['author'], user=row['user']
+        ).exclude(id=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subscriptions',
+            constraint=models.UniqueConstraint(fields=('author', 'user'), name='unique_for_author'),
+        ),
+    ]
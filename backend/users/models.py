@@ -24,6 +24,16 @@ class CustomUser(AbstractUser):
                                   blank=True)
     last_name = models.CharField('Фамилия', max_length=LAST_NAME_MAX,
                                  blank=True)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'